@@ -0,0 +1,433 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from candidate_plan import CandidatePlan
+
+# Metric labels of the check verdicts
+VERDICT_LABELS = {True: 'deliverable', False: 'undeliverable', None: 'unknown'}
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter.
+    Refills `rate` tokens per second up to `capacity`. Thread-safe, so one
+    bucket can be shared by several threads or event loops.
+    """
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, self.rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """
+        Takes one token and returns how many seconds the caller must wait
+        before using it. Tokens may go negative, which queues callers fairly.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self):
+        """Blocks the calling thread until a token is available. Returns the time waited."""
+        delay = self.reserve()
+        if delay:
+            time.sleep(delay)
+        return delay
+
+    async def acquire_async(self):
+        """Waits without blocking the event loop until a token is available. Returns the time waited."""
+        delay = self.reserve()
+        if delay:
+            await asyncio.sleep(delay)
+        return delay
+
+    def on_success(self):
+        """Called after an accepted request. A fixed-rate bucket ignores it."""
+
+    def on_throttle(self, retry_after=None):
+        """Called after a 429 answer. A fixed-rate bucket ignores it."""
+
+
+class AdaptiveRateLimiter(TokenBucket):
+    """
+    Token bucket whose rate follows the provider: while requests succeed it
+    creeps up by about `increase` x the starting rate per second (up to
+    `max_rate`), ten times slower close to the rate last throttled; when
+    throttled it is multiplied by `decrease` (down to `min_rate`) and every
+    caller pauses until the provider's Retry-After delay has passed.
+    Requests already in flight are throttled together, so the rate drops
+    only once until the pause is over. Capacity defaults to one token, as
+    bursts are what trip per-second quotas.
+    """
+    def __init__(self, rate, capacity=1, max_rate=None, min_rate=None, increase=0.05, decrease=0.9):
+        super().__init__(rate, capacity)
+        self.max_rate = float(max_rate) if max_rate else 2 * self.rate
+        self.min_rate = float(min_rate) if min_rate else self.rate / 10
+        self.step = increase * self.rate
+        self.decrease = decrease
+        self._ceiling = self.max_rate
+        self._resume_at = 0.0
+        self._hold_until = 0.0
+
+    def reserve(self):
+        delay = super().reserve()
+        with self._lock:
+            return max(delay, self._resume_at - time.monotonic())
+
+    def on_success(self):
+        """Additive increase after an accepted request."""
+        with self._lock:
+            # About `rate` successes a second: each adds step / rate
+            near_ceiling = self.rate >= self._ceiling * (1 + self.decrease) / 2
+            step = self.step / 10 if near_ceiling else self.step
+            self.rate = min(self.max_rate, self.rate + step / self.rate)
+
+    def on_throttle(self, retry_after=None):
+        """Multiplicative decrease after a 429, pausing for `retry_after` seconds when given."""
+        now = time.monotonic()
+        with self._lock:
+            if retry_after:
+                self._resume_at = max(self._resume_at, now + retry_after)
+            if now < self._hold_until:
+                return
+            self._ceiling = self.rate
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            self._tokens = min(self._tokens, 0.0)
+            self._hold_until = max(self._resume_at, now + 1 / self.rate)
+
+
+class _Dispatcher:
+    """
+    Sends one run's checks to the engine's client: one `check` call per
+    address or, when the engine has a `batch_size`, `check_many` calls
+    grouping the addresses requested within `batch_wait` seconds.
+    At most `concurrency` calls are in flight, each one paced by the limiter.
+    """
+    def __init__(self, engine, executor):
+        self.engine = engine
+        self.executor = executor
+        self.semaphore = asyncio.Semaphore(engine.concurrency)
+        self._pending = []
+        self._timer = None
+        self._tasks = set()
+
+    async def _call(self, func, arg):
+        engine = self.engine
+        async with self.semaphore:
+            if engine.limiter:
+                waited = await engine.limiter.acquire_async()
+                if engine.metrics is not None:
+                    engine.metrics.observe('stage_seconds', waited, stage='rate_limit_wait')
+            start = time.perf_counter()
+            result = await asyncio.get_running_loop().run_in_executor(self.executor, func, arg)
+            if engine.metrics is not None:
+                engine.metrics.observe('stage_seconds', time.perf_counter() - start, stage='check')
+        return result
+
+    def check(self, email):
+        """Returns an awaitable verdict for the address."""
+        batch_size = self.engine.batch_size
+        if not batch_size:
+            return self._call(self.engine.client.check, email)
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((email, future))
+        if len(self._pending) >= batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.engine.batch_wait, self._flush)
+        return future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch_size = self.engine.batch_size
+        while self._pending:
+            batch, self._pending = self._pending[:batch_size], self._pending[batch_size:]
+            task = asyncio.ensure_future(self._send(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, batch):
+        try:
+            verdicts = await self._call(self.engine.client.check_many, [email for email, _ in batch])
+        except Exception:
+            verdicts = {}
+        for email, future in batch:
+            if not future.done():
+                future.set_result(verdicts.get(email))
+
+
+class DomainScheduler:
+    """
+    Hands out one run's names so that mixed-domain batches are spread fairly
+    over the target domains: names wait in per-domain queues and are taken
+    round-robin across domains, `weights` giving some domains more turns
+    (smooth weighted round-robin). A domain never has more than
+    `concurrency` names in progress (None: no per-domain limit) and, with a
+    `rate`, its checks are paced by its own AdaptiveRateLimiter, which slows
+    down when checks on that domain fail (throttling, greylisting) without
+    holding up the other domains. Used from a single event loop.
+    """
+    def __init__(self, concurrency=None, rate=None, weights=None):
+        self.concurrency = concurrency
+        self.rate = rate
+        self.weights = weights or {}
+        self._queues = {}
+        self._active = {}
+        self._current = {}
+        self._limiters = {}
+        self._queued = 0
+        self._ready = asyncio.Condition()
+
+    def add(self, domain, item):
+        """Queues an item (a name) for its domain."""
+        self._queues.setdefault(domain, deque()).append(item)
+        self._active.setdefault(domain, 0)
+        self._current.setdefault(domain, 0)
+        self._queued += 1
+
+    def _take(self):
+        # Smooth weighted round-robin over the domains that have work and a free slot
+        eligible = [domain for domain, queue in self._queues.items()
+                    if queue and (self.concurrency is None or self._active[domain] < self.concurrency)]
+        if not eligible:
+            return None
+        total = 0
+        for domain in eligible:
+            weight = self.weights.get(domain, 1)
+            self._current[domain] += weight
+            total += weight
+        domain = max(eligible, key=self._current.__getitem__)
+        self._current[domain] -= total
+        self._active[domain] += 1
+        self._queued -= 1
+        return domain, self._queues[domain].popleft()
+
+    async def next(self):
+        """
+        Returns the next (domain, item) to work on, waiting while every domain
+        with queued names is at its limit, or None once the queues are empty.
+        Each item taken must be released.
+        """
+        async with self._ready:
+            while True:
+                taken = self._take()
+                if taken is not None or not self._queued:
+                    return taken
+                await self._ready.wait()
+
+    async def release(self, domain):
+        """Frees the domain's slot once an item taken from it is done."""
+        async with self._ready:
+            self._active[domain] -= 1
+            self._ready.notify_all()
+
+    def limiter(self, domain):
+        """Returns the domain's rate limiter, or None without a per-domain rate."""
+        if not self.rate:
+            return None
+        limiter = self._limiters.get(domain)
+        if limiter is None:
+            limiter = self._limiters[domain] = AdaptiveRateLimiter(self.rate)
+        return limiter
+
+    def report(self, domain, verdict):
+        """Feeds a check's outcome back to the domain's limiter: a failed check counts as throttling."""
+        limiter = self.limiter(domain)
+        if limiter is not None:
+            if verdict is None:
+                limiter.on_throttle()
+            else:
+                limiter.on_success()
+
+
+class AsyncVerificationEngine:
+    """
+    Runs deliverability checks concurrently.
+    At most `concurrency` checks are in flight at once and, when `rate` is
+    set, checks start no faster than `rate` per second (bursts up to `burst`).
+    The client's blocking `check(email)` calls run in a thread pool. Clients
+    with a bulk endpoint (a `batch_size`, see VerifierClient) get
+    `check_many` calls instead, grouping the checks requested together.
+    When a `cache` is given it is consulted before any network call and
+    filled with every definite verdict. A `known` index (KnownAddressIndex)
+    of past campaigns' confirmed and bounced addresses is looked up in bulk
+    before anything else. With `metrics`, known-address and cache hits, time
+    spent waiting for the rate limit, check latency and verdicts are recorded.
+    identify() spreads names over their domains with a DomainScheduler:
+    at most `domain_concurrency` names per domain at once, each domain's
+    checks paced at `domain_rate` per second, and `domain_weights` giving
+    some domains more turns.
+    """
+    def __init__(self, client, concurrency=10, rate=None, burst=None, cache=None, metrics=None,
+                 batch_size=None, batch_wait=0.05, known=None, domain_concurrency=None, domain_rate=None,
+                 domain_weights=None):
+        self.client = client
+        self.concurrency = concurrency
+        self.limiter = TokenBucket(rate, burst) if rate else None
+        self.cache = cache
+        self.metrics = metrics
+        self.batch_size = batch_size if batch_size is not None else getattr(client, 'batch_size', None)
+        self.batch_wait = batch_wait
+        self.known = known
+        self.domain_concurrency = domain_concurrency
+        self.domain_rate = domain_rate
+        self.domain_weights = domain_weights
+
+    def _known_verdicts(self, emails):
+        # One bulk lookup per run: {email: verdict} for the addresses in the index
+        if self.known is None:
+            return {}
+        return self.known.get_many(emails)
+
+    async def _check(self, email, dispatcher, known, scheduler=None):
+        metrics = self.metrics
+        verdict = known.get(email)
+        if verdict is not None:
+            if metrics is not None:
+                metrics.inc('known_hits_total')
+            return verdict
+        if self.cache is not None:
+            cached = self.cache.get(email)
+            if metrics is not None:
+                metrics.inc('cache_misses_total' if cached is None else 'cache_hits_total')
+            if cached is not None:
+                return cached
+        domain = email.rsplit('@', 1)[-1]
+        limiter = scheduler.limiter(domain) if scheduler is not None else None
+        if limiter is not None:
+            waited = await limiter.acquire_async()
+            if metrics is not None:
+                metrics.observe('stage_seconds', waited, stage='domain_wait')
+        verdict = await dispatcher.check(email)
+        if scheduler is not None:
+            scheduler.report(domain, verdict)
+        if metrics is not None:
+            metrics.inc('verifications_total', verdict=VERDICT_LABELS[verdict])
+        if self.cache is not None:
+            self.cache.put(email, verdict)
+        return verdict
+
+    async def _verify_many(self, emails):
+        unique = list(dict.fromkeys(emails))
+        known = self._known_verdicts(unique)
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            dispatcher = _Dispatcher(self, executor)
+            verdicts = await asyncio.gather(*(self._check(email, dispatcher, known) for email in unique))
+        return dict(zip(unique, verdicts))
+
+    async def _identify(self, candidate_maps, learner, stop_at_first, on_result, cancel, plan):
+        metrics = self.metrics
+        results = [{} for _ in candidate_maps]
+        ambiguous = (plan if plan is not None else CandidatePlan(candidate_maps)).ambiguous
+        # Repeated people are identified once and share the result
+        repeats = {}
+        for i, candidates in enumerate(candidate_maps):
+            repeats.setdefault(tuple(candidates.items()), []).append(i)
+        scheduler = DomainScheduler(self.domain_concurrency, self.domain_rate, self.domain_weights)
+        for indexes in repeats.values():
+            emails = list(candidate_maps[indexes[0]].values())
+            scheduler.add(emails[0].rsplit('@', 1)[-1] if emails else '', indexes)
+        known = self._known_verdicts(email for candidates in candidate_maps for email in candidates.values())
+        checks = {}
+
+        def check(email):
+            # Each distinct address is verified once per run; concurrent
+            # askers await the same check
+            task = checks.get(email)
+            if task is None:
+                task = checks[email] = asyncio.ensure_future(self._check(email, dispatcher, known, scheduler))
+            elif metrics is not None:
+                metrics.inc('deduplicated_checks_total')
+            return task
+
+        async def identify_one(candidates):
+            # Returns the verdicts and whether the name was finished: a hit
+            # was found or every style tried (not cut short by cancellation)
+            checked = {}
+            styles = list(candidates)
+            domain = None
+            if learner is not None and styles:
+                domain = candidates[styles[0]].rsplit('@', 1)[-1]
+                ordered = learner.candidates(domain, styles)
+                if len(ordered) == 1 and candidates[ordered[0]] in ambiguous:
+                    # The learned style gives an address shared with someone else: try the others too
+                    ordered += [style for style in styles if style != ordered[0]]
+                styles = ordered
+            for style in styles:
+                if cancel is not None and cancel.is_set():
+                    return checked, False
+                verdict = await check(candidates[style])
+                checked[style] = verdict
+                if verdict and candidates[style] not in ambiguous:
+                    # A shared address proves nothing about this person: keep looking
+                    if learner is not None:
+                        learner.record(domain, style)
+                    if stop_at_first:
+                        break
+            return checked, True
+
+        async def worker():
+            # Names are started only when a worker is free, so each one
+            # benefits from whatever the learner has confirmed so far
+            while True:
+                taken = await scheduler.next()
+                if taken is None:
+                    break
+                domain, indexes = taken
+                try:
+                    if cancel is not None and cancel.is_set():
+                        break
+                    checked, finished = await identify_one(candidate_maps[indexes[0]])
+                finally:
+                    await scheduler.release(domain)
+                for i in indexes:
+                    results[i] = dict(checked)
+                    if finished and on_result is not None:
+                        on_result(i, results[i])
+
+        # Bulk clients need enough names in flight to fill their batches
+        workers = self.concurrency * (self.batch_size or 1)
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            dispatcher = _Dispatcher(self, executor)
+            await asyncio.gather(*(worker() for _ in range(workers)))
+        return results
+
+    def verify_many(self, emails):
+        """
+        Checks every address and returns a dict mapping each unique address
+        to True, False or None (check failed).
+        """
+        return asyncio.run(self._verify_many(emails))
+
+    def identify(self, candidate_maps, learner=None, stop_at_first=True, on_result=None, cancel=None, plan=None):
+        """
+        For each name's dict of style -> candidate address, checks styles in
+        order and (with stop_at_first) stops at the first deliverable one.
+        Names are processed concurrently, interleaved across their domains
+        (see DomainScheduler). Each distinct address is checked
+        once, repeated names are identified once, and addresses the `plan`
+        (a CandidatePlan, by default one of these names) finds ambiguous
+        never count as a name's answer: the next styles are tried instead.
+        With a `learner`, styles are reordered (or skipped) using the patterns
+        confirmed so far on each domain.
+        `on_result(index, checked)` is called as soon as each name is done.
+        Setting the `cancel` event (a threading.Event) stops the run early;
+        names cut short by it are not reported to `on_result`, so they are
+        not journaled and a resumed run checks them again.
+        Returns, per name, a dict of the styles actually checked -> verdict
+        (partial for names cancelled midway, empty for names not reached).
+        """
+        return asyncio.run(self._identify(candidate_maps, learner, stop_at_first, on_result, cancel, plan))
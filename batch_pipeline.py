@@ -0,0 +1,457 @@
+import argparse
+import csv
+import io
+import json
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from candidate_plan import AssignedAddresses, CandidatePlan
+from checkpoint import CheckpointJournal, identify_with_checkpoint, is_resolved, journal_key
+from email_core import domain_preflight, infer_patterns, make_verification_engine, parse_known_pair, validate_many
+from email_generator import STYLES, generate_emails
+from metrics import Metrics
+from normalize_chars import normalize_accented_chars
+from pattern_learner import PatternLearner
+
+MODES = ('generate', 'validate', 'identify', 'infer')
+ASSIGNED_MEMORY = 1000000                                       # Assigned addresses remembered across chunks (16 MB)
+
+
+def _open_text(path, mode):
+    if path == '-':
+        return sys.stdin if mode == 'r' else sys.stdout
+    return open(path, mode, encoding='utf-8', newline='')
+
+
+def _text(value):
+    # A field as text: JSON numbers and booleans are converted, null is empty
+    if value is None:
+        return ''
+    return value if isinstance(value, str) else str(value)
+
+
+def _json_records(source, counts=None):
+    # JSON objects of a JSONL source; malformed lines and non-objects are skipped
+    for line in source:
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        if isinstance(record, dict):
+            yield record
+        elif counts is not None:
+            counts['malformed'] += 1
+
+
+def read_rows(path, name_col='name', first_col=None, last_col=None, domain_col=None, domain=None, counts=None):
+    """
+    Lazily yields (name, domain) pairs from a CSV, JSONL or plain text file
+    (one name per line). The domain comes from `domain_col` when present in
+    the row, otherwise from the default `domain`. Rows without a name or a
+    domain are skipped, and so are JSONL lines that are not JSON objects;
+    a `counts` dict gets the number of those under 'malformed'.
+    """
+    if counts is not None:
+        counts.setdefault('malformed', 0)
+    fmt = 'jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv' if path.endswith('.csv') else 'txt'
+    source = _open_text(path, 'r')
+    try:
+        if fmt == 'csv':
+            records = csv.DictReader(source)
+        elif fmt == 'jsonl':
+            records = _json_records(source, counts)
+        else:
+            records = ({name_col: line} for line in source)
+
+        for record in records:
+            if first_col or last_col:
+                name = f"{_text(record.get(first_col))} {_text(record.get(last_col))}"
+            else:
+                name = _text(record.get(name_col))
+            row_domain = (_text(record.get(domain_col)) if domain_col else None) or domain
+            name = name.strip()
+            if name and row_domain:
+                yield name, row_domain.strip()
+    finally:
+        if source is not sys.stdin:
+            source.close()
+
+
+def read_known_pairs(path, name_col='name', email_col='email'):
+    """
+    Lazily yields known (name, email) pairs from a CSV or JSONL file with
+    name and email columns, or a plain text file of 'name, email' lines.
+    JSONL lines that are not JSON objects are skipped.
+    """
+    fmt = 'jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv' if path.endswith('.csv') else 'txt'
+    with open(path, encoding='utf-8', newline='') as source:
+        if fmt == 'txt':
+            for line in source:
+                pair = parse_known_pair(line)
+                if pair:
+                    yield pair
+            return
+        records = csv.DictReader(source) if fmt == 'csv' else _json_records(source)
+        for record in records:
+            name = _text(record.get(name_col)).strip()
+            email = _text(record.get(email_col)).strip()
+            if name and '@' in email:
+                yield name, email
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def generate_chunk(chunk, styles=STYLES):
+    """
+    Generates candidates for a chunk of (name, domain) rows.
+    Rows are grouped by domain so each group is generated in one pass.
+    Returns one tuple of emails per row, in input order.
+    """
+    by_domain = {}
+    for i, (name, domain) in enumerate(chunk):
+        by_domain.setdefault(domain, []).append(i)
+    rows = [None] * len(chunk)
+    for domain, indexes in by_domain.items():
+        names = [chunk[i][0] for i in indexes]
+        generated = generate_emails(names, domain, styles, layout='name', normalize=normalize_accented_chars)
+        for i, emails in zip(indexes, generated):
+            rows[i] = emails
+    return rows
+
+
+def process_rows(rows, mode='validate', styles=STYLES, engine=None, learner=None,
+                 chunk_size=1000, journal=None, preflight=None, metrics=None, patterns=None,
+                 assigned_memory=ASSIGNED_MEMORY):
+    """
+    Yields one result dict per input row, processing `chunk_size` rows at a time
+    so memory stays bounded whatever the input size.
+    'generate' lists the candidates, 'validate' adds the offline regex
+    verdict per candidate and 'identify' verifies candidates with `engine`,
+    skipping the rows already resolved in `journal` when one is given.
+    In identify mode each distinct address of a chunk is verified once;
+    deliverable addresses generated for several different people of the
+    chunk are listed under 'ambiguous' instead of being assigned. Up to
+    `assigned_memory` assigned addresses are remembered across chunks (0 for
+    none): one already assigned to another person in an earlier chunk is
+    listed under 'ambiguous' too (the earlier row, already yielded, keeps it).
+    With a DomainPreflight, each chunk's distinct domains are resolved first and
+    rows of domains that cannot receive mail are marked invalid without verification.
+    'infer' renders each row with its domain's pattern from the PatternIndex
+    `patterns`, without verification; rows of unknown domains get no email.
+    With a Metrics object, the time spent in each stage is recorded into it.
+    """
+    if metrics is None:
+        metrics = Metrics()
+    styles = tuple(styles)
+    assigned = AssignedAddresses(assigned_memory) if mode == 'identify' and assigned_memory else None
+    for chunk in _chunks(rows, chunk_size):
+        if mode == 'infer':
+            with metrics.timer('infer'):
+                for name, domain in chunk:
+                    pattern = patterns.pattern(domain)
+                    yield {
+                        'name': name,
+                        'domain': domain,
+                        'email': patterns.generate(name, domain),
+                        'pattern': pattern.template if pattern else None,
+                        'confidence': round(pattern.matched / pattern.total, 3) if pattern else 0.0,
+                    }
+            continue
+
+        with metrics.timer('generate'):
+            generated = generate_chunk(chunk, styles)
+
+        if mode == 'identify':
+            candidates = [dict(zip(styles, emails)) for emails in generated]
+            statuses = {}
+            if preflight is not None:
+                with metrics.timer('preflight'):
+                    statuses = preflight.check_many(domain for _, domain in chunk)
+            dead = {domain for domain, status in statuses.items() if not status.accepts_mail}
+            live = [i for i, (_, domain) in enumerate(chunk) if domain.lower() not in dead]
+
+            checked = [dict.fromkeys(styles, False) for _ in chunk]
+            live_candidates = [candidates[i] for i in live]
+            with metrics.timer('plan'):
+                plan = CandidatePlan(live_candidates)
+                if assigned is not None:
+                    # Addresses assigned to someone else in an earlier chunk are ambiguous here too
+                    plan.mark_ambiguous(assigned.taken(live_candidates))
+            with metrics.timer('verify'):
+                if journal is not None:
+                    keys = [journal_key(*chunk[i]) for i in live]
+                    live_checked = identify_with_checkpoint(engine, keys, live_candidates, journal, learner=learner,
+                                                            plan=plan)
+                else:
+                    live_checked = engine.identify(live_candidates, learner=learner, plan=plan)
+            for i, verdicts in zip(live, live_checked):
+                checked[i] = verdicts
+
+            for (name, domain), name_candidates, verdicts in zip(chunk, candidates, checked):
+                email, shared = plan.choose(name_candidates, verdicts)
+                if email is not None and assigned is not None:
+                    assigned.assign(email, name_candidates)
+                result = {
+                    'name': name,
+                    'domain': domain,
+                    'email': email,
+                    'ambiguous': shared,
+                    'checked': verdicts
+                }
+                status = statuses.get(domain.lower())
+                if status is not None:
+                    result['domain_status'] = status.status
+                    result['domain_flags'] = sorted(status.flags)
+                yield result
+            continue
+
+        if mode == 'validate':
+            with metrics.timer('validate'):
+                validity = [validate_many(emails) for emails in generated]
+        for i, ((name, domain), emails) in enumerate(zip(chunk, generated)):
+            result = {'name': name, 'domain': domain, 'emails': dict(zip(styles, emails))}
+            if mode == 'validate':
+                result['valid'] = dict(zip(styles, validity[i]))
+            yield result
+
+
+class ResultEncoder:
+    """
+    Turns results into JSON lines, or into CSV rows when `as_csv` is set.
+    """
+    def __init__(self, styles=STYLES, as_csv=False):
+        self.styles = tuple(styles)
+        self.as_csv = as_csv
+
+    def header(self, result):
+        """
+        Returns the CSV header matching a result (None for JSON lines).
+        """
+        if not self.as_csv:
+            return None
+        if 'emails' in result:
+            header = ['name', 'domain'] + list(self.styles)
+            if 'valid' in result:
+                header += [f"{style}_valid" for style in self.styles]
+        else:
+            header = ['name', 'domain', 'email']
+            if 'ambiguous' in result:
+                header.append('ambiguous')
+            if 'pattern' in result:
+                header += ['pattern', 'confidence']
+            if 'domain_status' in result:
+                header += ['domain_status', 'domain_flags']
+        return header
+
+    def _csv_row(self, result):
+        if 'emails' in result:
+            row = [result['name'], result['domain']] + [result['emails'][style] for style in self.styles]
+            if 'valid' in result:
+                row += [result['valid'][style] for style in self.styles]
+        else:
+            row = [result['name'], result['domain'], result['email'] or '']
+            if 'ambiguous' in result:
+                row.append(' '.join(result['ambiguous']))
+            if 'pattern' in result:
+                row += [result['pattern'] or '', result['confidence']]
+            if 'domain_status' in result:
+                row += [result['domain_status'], ' '.join(result['domain_flags'])]
+        return row
+
+    def encode_rows(self, rows):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue()
+
+    def encode(self, results):
+        """
+        Returns the text for a list of results.
+        """
+        if self.as_csv:
+            return self.encode_rows(map(self._csv_row, results))
+        return ''.join(json.dumps(result, ensure_ascii=False) + '\n' for result in results)
+
+
+def _encode_chunk(chunk, mode, styles, as_csv):
+    # Runs in a worker process: processes and encodes one chunk
+    encoder = ResultEncoder(styles, as_csv)
+    results = list(process_rows(chunk, mode, styles, chunk_size=len(chunk)))
+    return len(results), encoder.header(results[0]), encoder.encode(results)
+
+
+def process_rows_parallel(rows, mode='validate', styles=STYLES, as_csv=False, chunk_size=1000, workers=2):
+    """
+    Like process_rows for the 'generate' and 'validate' modes, but spreads the
+    chunks over `workers` processes, which also encode the results.
+    Yields (count, csv_header, text) per chunk, in input order. At most two
+    chunks per worker are in flight, so memory stays bounded.
+    """
+    if mode not in ('generate', 'validate'):
+        raise ValueError(f"Mode {mode!r} cannot run in worker processes")
+    styles = tuple(styles)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for chunk in _chunks(rows, chunk_size):
+            pending.append(executor.submit(_encode_chunk, chunk, mode, styles, as_csv))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+class ResultWriter:
+    """
+    Writes results incrementally as JSON lines, or as CSV when the output path ends in .csv.
+    """
+    def __init__(self, path, styles=STYLES, flush_every=1000):
+        self.path = path
+        self.flush_every = flush_every
+        self.count = 0
+        self.encoder = ResultEncoder(styles, as_csv=path.endswith('.csv'))
+        self._file = _open_text(path, 'w')
+        self._header_written = False
+
+    def write_encoded(self, count, header, text):
+        """
+        Writes `count` results already encoded by a ResultEncoder.
+        """
+        if header is not None and not self._header_written:
+            self._file.write(self.encoder.encode_rows([header]))
+            self._header_written = True
+        self._file.write(text)
+        flushes = self.count // self.flush_every
+        self.count += count
+        if self.count // self.flush_every != flushes:
+            self._file.flush()
+
+    def write(self, result):
+        self.write_encoded(1, self.encoder.header(result), self.encoder.encode([result]))
+
+    def close(self):
+        if self._file is sys.stdout:
+            self._file.flush()
+        else:
+            self._file.close()
+
+
+def build_parser(prog='batch'):
+    parser = argparse.ArgumentParser(
+        prog=prog,
+        description="Generate, validate or identify email addresses for a large list of names, streaming results."
+    )
+    parser.add_argument('--in', dest='input', required=True,
+                        help="Input file: .csv (with header), .jsonl or plain text with one name per line ('-' for stdin)")
+    parser.add_argument('--out', default='-', help="Output file: .jsonl (default) or .csv ('-' for stdout)")
+    parser.add_argument('--name-col', default='name', help="Column holding the full name (default: name)")
+    parser.add_argument('--first-col', help="Column holding the first name (used with --last-col instead of --name-col)")
+    parser.add_argument('--last-col', help="Column holding the last name")
+    parser.add_argument('--domain-col', help="Column holding each row's domain")
+    parser.add_argument('--domain', help="Domain for rows without a domain column value")
+    parser.add_argument('--mode', choices=MODES, default='validate',
+                        help="generate: list candidates; validate: add regex validation; identify: verify with the API; "
+                             "infer: apply each domain's pattern learned from --known addresses")
+    parser.add_argument('--styles', nargs='+', choices=STYLES, default=list(STYLES), help="Styles to generate")
+    parser.add_argument('--known',
+                        help="In infer mode, file of known addresses: .csv/.jsonl with name and email columns, "
+                             "or text lines of 'name, email'")
+    parser.add_argument('--email-col', default='email', help="Column of --known holding the address (default: email)")
+    parser.add_argument('--learn-patterns', action='store_true',
+                        help="In identify mode, learn each domain's format and try it first")
+    parser.add_argument('--checkpoint',
+                        help="In identify mode, journal progress to this file and resume from it after a crash")
+    parser.add_argument('--no-preflight', dest='preflight', action='store_false',
+                        help="In identify mode, don't resolve domains before verifying (dead domains are then verified too)")
+    parser.add_argument('--chunk-size', type=int, default=1000,
+                        help="Rows processed per chunk (default: 1000). In identify mode, an address "
+                             "colliding with one assigned in an earlier chunk is flagged only on the later row")
+    parser.add_argument('--assigned-memory', type=int, default=ASSIGNED_MEMORY,
+                        help="In identify mode, assigned addresses remembered across chunks to flag collisions, "
+                             f"16 bytes each; 0 for none (default: {ASSIGNED_MEMORY})")
+    parser.add_argument('--metrics',
+                        help="Write run metrics to this file: .json, or Prometheus text format otherwise")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Processes used to generate and validate chunks in generate/validate mode (default: 1)")
+    return parser
+
+
+def main(argv=None, prog='batch'):
+    """
+    Runs the batch command.
+    """
+    args = build_parser(prog).parse_args(argv)
+    if not args.domain_col and not args.domain:
+        print("Error: give --domain-col and/or --domain", file=sys.stderr)
+        return 2
+    if args.mode == 'infer' and not args.known:
+        print("Error: infer mode needs --known", file=sys.stderr)
+        return 2
+
+    counts = {'malformed': 0}
+    rows = read_rows(args.input, args.name_col, args.first_col, args.last_col, args.domain_col, args.domain, counts)
+    metrics = Metrics()
+    engine = close = learner = journal = preflight = patterns = None
+    if args.mode == 'infer':
+        with metrics.timer('learn'):
+            patterns = infer_patterns(read_known_pairs(args.known, args.name_col, args.email_col))
+        print(f"Learned the pattern of {len(patterns)} domains", file=sys.stderr)
+    if args.mode == 'identify':
+        engine, close = make_verification_engine(metrics)
+        if args.preflight:
+            preflight = domain_preflight()
+        if args.learn_patterns:
+            learner = PatternLearner()
+        if args.checkpoint:
+            journal = CheckpointJournal(args.checkpoint)
+
+    parallel = args.workers > 1 and args.mode in ('generate', 'validate')
+    if args.workers > 1 and not parallel:
+        # Identify mode waits on the network and infer mode is a lookup: one process is enough
+        print("Note: --workers only applies to generate and validate modes", file=sys.stderr)
+
+    writer = ResultWriter(args.out, args.styles)
+    unresolved = 0
+    try:
+        if parallel:
+            blocks = process_rows_parallel(rows, args.mode, args.styles, writer.encoder.as_csv,
+                                           chunk_size=args.chunk_size, workers=args.workers)
+            for block in blocks:
+                writer.write_encoded(*block)
+        else:
+            results = process_rows(rows, args.mode, args.styles, engine=engine, learner=learner,
+                                   chunk_size=args.chunk_size, journal=journal, preflight=preflight,
+                                   metrics=metrics, patterns=patterns, assigned_memory=args.assigned_memory)
+            for result in results:
+                writer.write(result)
+                if args.mode == 'identify' and not is_resolved(result['checked']):
+                    unresolved += 1
+    finally:
+        writer.close()
+        if close is not None:
+            close()
+        if journal is not None:
+            journal.close()
+
+    if journal is not None and not unresolved:
+        # Every row resolved: nothing of this run left to resume
+        journal.discard()
+    print(f"Processed {writer.count} names", file=sys.stderr)
+    if counts['malformed']:
+        print(f"Skipped {counts['malformed']} input lines that are not JSON objects", file=sys.stderr)
+    if unresolved:
+        print(f"{unresolved} names could not be fully checked; run again to retry them", file=sys.stderr)
+    if args.mode == 'identify':
+        print(metrics.summary(), file=sys.stderr)
+    if args.metrics:
+        metrics.write(args.metrics)
+    return 0
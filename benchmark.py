@@ -0,0 +1,342 @@
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+
+from async_verifier import AsyncVerificationEngine
+from email_core import format_email_all_styles, validate_many
+from email_generator import _clean_part, clean_domain, parse_name, render_columns, split_name
+from normalize_chars import TRANSLATION_TABLE, _normalize_name, _normalize_token, normalize_accented_chars
+from verifier_clients import MockVerifier
+
+DEFAULT_SIZES = (1000, 100000, 1000000)
+DEFAULT_THRESHOLD = 0.25                                        # Fraction a stage may slow down before it counts as a regression
+STAGES = ('normalize', 'parse', 'clean', 'render', 'validate', 'total')
+
+# Multilingual first names and surnames used to build synthetic corpora
+FIRST_NAMES = [
+    'John', 'Mary', 'James', 'Emma', 'Olivia', 'Noah',                      # English
+    'Élodie', 'François', 'Hélène', 'Jérôme', 'Loïc', 'Anaïs', 'Chloé',     # French
+    'Jürgen', 'Björn', 'Günther', 'Käthe', 'Jörg', 'Lukas',                 # German / Nordic
+    'Søren', 'Åsa', 'Ægir', 'Þórdís', 'Øystein',                            # Scandinavian / Icelandic
+    'Łukasz', 'Michał', 'Wojciech', 'Zofia', 'Małgorzata',                  # Polish
+    'Đorđe', 'Dušan', 'Željko', 'Milica', 'Čedomir',                        # Serbo-Croatian
+    'José', 'María', 'Iñigo', 'Begoña', 'João', 'Conceição',                # Spanish / Portuguese
+    'Şükrü', 'Gülşen', 'İbrahim', 'Çağla',                                  # Turkish
+    'Nguyễn Thị', 'Trần Văn', 'Lê Hoàng',                                   # Vietnamese
+    'Jean Marie', 'Anne-Sophie', 'Marie Claire',                            # Compound
+]
+LAST_NAMES = [
+    'Smith', 'Johnson', 'Brown', 'Taylor', "O'Brien",
+    'Lefèvre', 'Dubœuf', 'Géraud', 'Bénédicte', 'Müller',
+    'Straße', 'Schröder', 'Jäger', 'Kierkegaard', 'Sørensen',
+    'Þórsson', 'Wałęsa', 'Żółkiewski', 'Brzęczyszczykiewicz', 'Đorđević',
+    'Petrović', 'Šćepanović', 'Núñez', 'Gonçalves', 'Ibáñez',
+    'Öztürk', 'Yılmaz', 'Çelik', 'Nguyễn', 'Phạm',
+]
+
+
+def build_name_corpus(rows, seed=42):
+    """
+    Builds a synthetic list of multilingual full names.
+    """
+    rng = random.Random(seed)
+    return [f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}" for _ in range(rows)]
+
+
+def legacy_normalize_accented_chars(text):
+    """
+    The original character-by-character normalizer, kept for comparison.
+    """
+    if not text:
+        return text
+    char_map = {
+        'é': 'e', 'è': 'e', 'ê': 'e', 'ë': 'e', 'ç': 'c', 'à': 'a', 'â': 'a', 'ä': 'a',
+        'ô': 'o', 'ö': 'o', 'î': 'i', 'ï': 'i', 'ù': 'u', 'û': 'u', 'ü': 'u'
+    }
+    normalized_text = ''
+    for char in text:
+        normalized_text += char_map.get(char, char)
+    return normalized_text
+
+
+def measure(func, items):
+    """
+    Applies func to every item and returns (seconds, items per second).
+    """
+    start = time.perf_counter()
+    for item in items:
+        func(item)
+    elapsed = time.perf_counter() - start
+    return elapsed, len(items) / elapsed if elapsed else float('inf')
+
+
+def bench_normalize(names):
+    """
+    Compares the table-driven normalizer, with and without memoization,
+    with the legacy one.
+    """
+    results = {}
+    normalizers = (
+        ('legacy', legacy_normalize_accented_chars),
+        ('uncached', lambda name: name.translate(TRANSLATION_TABLE)),
+        ('table', normalize_accented_chars),
+    )
+    for label, func in normalizers:
+        elapsed, rate = measure(func, names)
+        results[label] = rate
+        print(f"  {label:<8} {elapsed:8.3f}s  {rate:12,.0f} names/s")
+    unconverted = sum(1 for name in names if not normalize_accented_chars(name).isascii())
+    legacy_unconverted = sum(1 for name in names if not legacy_normalize_accented_chars(name).isascii())
+    print(f"  speed-up {results['table'] / results['legacy']:.1f}x; names left with non-ASCII letters: "
+          f"legacy {legacy_unconverted:,}, table {unconverted:,}")
+    return results
+
+
+def _clear_caches():
+    # Normalization, parsing and domain cleaning are memoized: start every timed run cold
+    _normalize_name.cache_clear()
+    _normalize_token.cache_clear()
+    parse_name.cache_clear()
+    clean_domain.cache_clear()
+
+
+def best_time(func, repeat=3, number=1):
+    """
+    Runs func `number` times per round and returns the best round's time per call.
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def run_stages(names, domain='example.com', repeat=3):
+    """
+    Times each stage of generation separately, each one fed with the output
+    of the previous one, then the whole path (format_email_all_styles and
+    validate_many). Returns {stage: names per second}.
+    """
+    domain = clean_domain(domain)
+    # Small corpora are run several times per round to get measurable times
+    number = max(1, 100000 // len(names))
+
+    def normalize():
+        _clear_caches()
+        return list(map(normalize_accented_chars, names))
+
+    def total():
+        _clear_caches()
+        return [validate_many(emails) for emails in format_email_all_styles(names, domain).values()]
+
+    normalized = normalize()
+    split = list(map(split_name, normalized))
+    records = [parse_name(name) for name in normalized]
+    columns = render_columns(records, domain)
+
+    stages = {
+        'normalize': normalize,
+        'parse': lambda: list(map(split_name, normalized)),
+        'clean': lambda: [(_clean_part(first), _clean_part(last)) for first, last in split],
+        'render': lambda: render_columns(records, domain),
+        'validate': lambda: [validate_many(emails) for emails in columns],
+        'total': total,
+    }
+    return {stage: len(names) / best_time(func, repeat, number) for stage, func in stages.items()}
+
+
+def peak_memory(names, domain='example.com'):
+    """
+    Returns the peak memory, in bytes, allocated while generating and
+    validating every style for the names.
+    """
+    _clear_caches()
+    tracemalloc.start()
+    try:
+        for emails in format_email_all_styles(names, domain).values():
+            validate_many(emails)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def bench_verify(names, latency=0.05, concurrency=10, style='flastname', batch_size=None):
+    """
+    Identifies the address of every name against a MockVerifier waiting
+    `latency` seconds per call, where only `style` is deliverable: one
+    address per call or, with `batch_size`, in bulk calls.
+    Returns (names per second, calls per name).
+    """
+    all_formats = format_email_all_styles(names, 'example.com')
+    mock = MockVerifier(all_formats[style], latency=latency, batch_size=batch_size)
+    candidates = [{s: emails[i] for s, emails in all_formats.items()} for i in range(len(names))]
+    engine = AsyncVerificationEngine(mock, concurrency=concurrency)
+    start = time.perf_counter()
+    engine.identify(candidates)
+    elapsed = time.perf_counter() - start
+    return len(names) / elapsed, mock.calls / len(names)
+
+
+class DomainSimulator(MockVerifier):
+    """
+    Mock with per-domain behavior: each check waits its domain's latency
+    (`latencies`, default `latency`), and a domain answers checks beyond
+    `capacity` at once with None, like a mail server greylisting a burst.
+    Throttled checks are counted per domain.
+    """
+    def __init__(self, deliverable=(), latency=0.02, capacity=None, latencies=None):
+        super().__init__(deliverable, latency=latency)
+        self.capacity = capacity
+        self.latencies = latencies or {}
+        self.throttled = {}
+        self._active = {}
+
+    def check(self, email):
+        domain = email.rsplit('@', 1)[-1]
+        with self._lock:
+            self.calls += 1
+            self.checked += 1
+            self._active[domain] = self._active.get(domain, 0) + 1
+            over = self.capacity is not None and self._active[domain] > self.capacity
+        try:
+            time.sleep(self.latencies.get(domain, self.latency))
+            if over:
+                with self._lock:
+                    self.throttled[domain] = self.throttled.get(domain, 0) + 1
+                return None
+            return self._verdict(email)
+        finally:
+            with self._lock:
+                self._active[domain] -= 1
+
+    def check_many(self, emails):
+        return {email: self.check(email) for email in dict.fromkeys(emails)}
+
+
+def bench_domains(names, domains=10, share=0.8, latency=0.02, capacity=3, concurrency=20,
+                  domain_concurrency=None, domain_rate=None):
+    """
+    Identifies a mixed-company batch where one domain holds `share` of the
+    names and the others split the rest, against a DomainSimulator where
+    each domain greylists checks beyond `capacity` at once.
+    Returns (names per second, resolved names per second, throttled checks).
+    """
+    rng = random.Random(7)
+    rows = []
+    for name in names:
+        domain = 'big.example' if rng.random() < share else f"small{rng.randrange(1, domains)}.example"
+        rows.append((name, domain))
+    candidates = []
+    deliverable = set()
+    for name, domain in rows:
+        emails = format_email_all_styles([name], domain)
+        candidates.append({style: found[0] for style, found in emails.items()})
+        deliverable.add(emails['flastname'][0])
+    simulator = DomainSimulator(deliverable, latency=latency, capacity=capacity)
+    engine = AsyncVerificationEngine(simulator, concurrency=concurrency, domain_concurrency=domain_concurrency,
+                                     domain_rate=domain_rate)
+    start = time.perf_counter()
+    results = engine.identify(candidates)
+    elapsed = time.perf_counter() - start
+    resolved = sum(1 for checked in results if any(checked.values()))
+    return len(rows) / elapsed, resolved / elapsed, sum(simulator.throttled.values())
+
+
+def find_regressions(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Compares results with a saved baseline and returns a description of every
+    stage more than `threshold` slower (or memory more than `threshold` larger).
+    """
+    regressions = []
+    for size, rates in results['names_per_second'].items():
+        for stage, rate in rates.items():
+            before = baseline.get('names_per_second', {}).get(size, {}).get(stage)
+            if before and rate < before * (1 - threshold):
+                regressions.append(f"{size} rows, {stage}: {rate:,.0f} names/s, baseline {before:,.0f}")
+    for size, peak in results['peak_memory'].items():
+        before = baseline.get('peak_memory', {}).get(size)
+        if before and peak > before * (1 + threshold):
+            regressions.append(f"{size} rows, peak memory: {peak / 2**20:.1f} MiB, baseline {before / 2**20:.1f} MiB")
+    before = baseline.get('verify')
+    if before and results.get('verify') and results['verify'] < before * (1 - threshold):
+        regressions.append(f"verify: {results['verify']:,.1f} names/s, baseline {before:,.1f}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the email finder's hot paths.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES),
+                        help="Sizes of the synthetic name corpora (default: 1000 100000 1000000)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeat', type=int, default=3, help="Rounds per stage; the best one is kept")
+    parser.add_argument('--legacy', action='store_true', help="Also compare normalization with the legacy normalizer")
+    parser.add_argument('--verify-names', type=int, default=200,
+                        help="Names identified against the mock verifier (0 to skip)")
+    parser.add_argument('--latency', type=float, default=0.05, help="Simulated verification latency in seconds")
+    parser.add_argument('--verify-batch', type=int, default=0,
+                        help="Also time a bulk provider taking this many addresses per call")
+    parser.add_argument('--domains', type=int, default=0,
+                        help="Also identify a mixed batch of --verify-names names over this many simulated domains")
+    parser.add_argument('--domain-capacity', type=int, default=3,
+                        help="Checks a simulated domain accepts at once before greylisting (default: 3)")
+    parser.add_argument('--baseline', help="Baseline JSON file to compare with; exits with status 1 on regression")
+    parser.add_argument('--save-baseline', help="Write the results to this JSON file")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed slowdown before a stage counts as regressed (default: 0.25)")
+    args = parser.parse_args(argv)
+
+    results = {'names_per_second': {}, 'peak_memory': {}}
+    for size in args.sizes:
+        names = build_name_corpus(size, args.seed)
+        print(f"\n{size:,} multilingual names")
+        if args.legacy:
+            bench_normalize(names)
+        rates = run_stages(names, repeat=args.repeat)
+        for stage in STAGES:
+            print(f"  {stage:<10} {rates[stage]:12,.0f} names/s  {1e6 / rates[stage]:8.2f} µs/name")
+        peak = peak_memory(names)
+        print(f"  peak memory {peak / 2**20:.1f} MiB")
+        results['names_per_second'][str(size)] = rates
+        results['peak_memory'][str(size)] = peak
+
+    if args.verify_names:
+        names = build_name_corpus(args.verify_names, args.seed)
+        rate, calls = bench_verify(names, args.latency)
+        print(f"\nVerification of {args.verify_names:,} names at {args.latency * 1000:.0f} ms per call: "
+              f"{rate:,.1f} names/s, {calls:.1f} calls per name")
+        results['verify'] = rate
+        if args.verify_batch:
+            rate, calls = bench_verify(names, args.latency, batch_size=args.verify_batch)
+            print(f"  in batches of {args.verify_batch}: {rate:,.1f} names/s, {calls:.2f} calls per name")
+        if args.domains:
+            print(f"\nMixed batch over {args.domains} domains (80% on one), {args.domain_capacity} checks "
+                  f"at once per domain before greylisting:")
+            for label, limit in (('no per-domain limit', None), ('per-domain limit', args.domain_capacity)):
+                rate, resolved, throttled = bench_domains(names, args.domains, latency=args.latency,
+                                                          capacity=args.domain_capacity, domain_concurrency=limit)
+                print(f"  {label:<20} {rate:8,.1f} names/s, {resolved:8,.1f} resolved/s, {throttled} checks throttled")
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = find_regressions(results, baseline, args.threshold)
+        if regressions:
+            print("\nRegressions:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print("\nNo regression against the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+from array import array
+
+_MASK = (1 << 64) - 1
+
+
+def _hash64(value):
+    # Non-zero 64-bit hash: zero marks an empty slot
+    return hash(value) & _MASK or 1
+
+
+class CandidatePlan:
+    """
+    Verification plan of a batch of names, built from each name's dict of
+    style -> candidate address.
+    Each distinct address is verified once, whichever names it was generated
+    for, and people are told apart by their set of candidates, so repeated
+    names are identified once and share the result. An address generated for
+    several different people (such as jd@ for both John Doe and Jane Dale)
+    is ambiguous: a deliverable verdict does not say whose it is, so it is
+    never assigned to anyone.
+    """
+    def __init__(self, candidate_maps):
+        people = {}
+        owners = {}
+        for candidates in candidate_maps:
+            person = people.setdefault(tuple(candidates.values()), len(people))
+            for email in candidates.values():
+                owners.setdefault(email, set()).add(person)
+        self.people = len(people)
+        self.unique = len(owners)
+        self.ambiguous = frozenset(email for email, persons in owners.items() if len(persons) > 1)
+
+    def mark_ambiguous(self, emails):
+        """
+        Treats `emails` as ambiguous too, such as addresses already assigned
+        to other people outside the plan.
+        """
+        self.ambiguous = self.ambiguous.union(emails)
+
+    def is_ambiguous(self, email):
+        return email in self.ambiguous
+
+    def choose(self, candidates, checked):
+        """
+        Picks a name's address from its verdicts: the first deliverable
+        candidate that is not ambiguous, or None.
+        Returns (email, deliverable candidates shared with other people).
+        """
+        chosen = None
+        shared = []
+        for style, verdict in checked.items():
+            if not verdict:
+                continue
+            email = candidates[style]
+            if email in self.ambiguous:
+                shared.append(email)
+            elif chosen is None:
+                chosen = email
+        return chosen, shared
+
+
+class AssignedAddresses:
+    """
+    Bounded memory of the person each address was assigned to, across plans
+    (such as the chunks of a batch). A fixed table of `size` slots holds a
+    64-bit hash of the address and of its owner's candidates, 16 bytes per
+    slot however long the run; an address landing in a used slot replaces
+    the one there, which is then forgotten.
+    """
+    def __init__(self, size):
+        self.size = size
+        self._addresses = array('Q', [0]) * size
+        self._owners = array('Q', [0]) * size
+
+    def _slot(self, email):
+        key = _hash64(email)
+        return key % self.size, key
+
+    def assign(self, email, candidates):
+        """
+        Records that `email` was assigned to the person with these candidates.
+        """
+        slot, key = self._slot(email)
+        self._addresses[slot] = key
+        self._owners[slot] = _hash64(tuple(candidates.values()))
+
+    def taken(self, candidate_maps):
+        """
+        Returns the candidates already assigned to someone else.
+        """
+        taken = set()
+        for candidates in candidate_maps:
+            person = _hash64(tuple(candidates.values()))
+            for email in candidates.values():
+                slot, key = self._slot(email)
+                if self._addresses[slot] == key and self._owners[slot] != person:
+                    taken.add(email)
+        return taken
@@ -0,0 +1,189 @@
+import hashlib
+import json
+import os
+import time
+from array import array
+from bisect import bisect_left
+
+from candidate_plan import CandidatePlan
+
+
+def journal_key(name, domain):
+    """
+    Returns the key a name is journaled under.
+    """
+    return f"{name.strip()}\t{domain.strip().lower()}"
+
+
+def _key_hash(key):
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def is_resolved(checked):
+    """
+    Tells whether a name's verification results are final: at least one
+    style was checked and no check failed (failed checks are retried).
+    """
+    return bool(checked) and all(verdict is not None for verdict in checked.values())
+
+
+class CheckpointJournal:
+    """
+    Append-only JSON-lines journal of resolved verification results, so a
+    restarted run can skip names that were already resolved.
+    Records are buffered and written in bulk: the buffer is flushed and
+    fsynced every `batch_size` records or `flush_interval` seconds.
+    Only a 64-bit hash and a file offset are kept in memory per journaled
+    name (16 bytes); results are read back from disk when looked up. Names
+    recorded by this run are not looked up again.
+    """
+    def __init__(self, path, batch_size=500, flush_interval=2.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.recorded = 0
+        self._keys, self._offsets, complete = self._load()
+        # Bitmap of the journaled names this run looked up: its own entries
+        self._looked_up = bytearray((len(self._keys) + 7) // 8)
+        self._reader = None
+        self._buffer = []
+        self._last_flush = time.monotonic()
+        self._file = open(path, 'a', encoding='utf-8')
+        if not complete:
+            # Last line cut short by a crash: start the next record on its own line
+            self._file.write('\n')
+
+    def _load(self):
+        # Returns the sorted key hashes, the offset of each key's last record
+        # and whether the file ends with a complete line
+        entries = []
+        complete = True
+        if os.path.exists(self.path):
+            with open(self.path, 'rb') as journal:
+                offset = 0
+                for line in journal:
+                    complete = line.endswith(b'\n')
+                    try:
+                        entries.append((_key_hash(json.loads(line)['key']), offset))
+                    except ValueError:
+                        # Last line cut short by a crash
+                        pass
+                    offset += len(line)
+        entries.sort()
+        keys, offsets = array('Q'), array('Q')
+        for key_hash, offset in entries:
+            if keys and keys[-1] == key_hash:
+                # A later record of the same name wins
+                offsets[-1] = offset
+            else:
+                keys.append(key_hash)
+                offsets.append(offset)
+        return keys, offsets, complete
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __len__(self):
+        return len(self._keys) + self.recorded
+
+    def get(self, key):
+        """
+        Returns the journaled results of a name, or None.
+        """
+        key_hash = _key_hash(key)
+        i = bisect_left(self._keys, key_hash)
+        if i == len(self._keys) or self._keys[i] != key_hash:
+            return None
+        if self._reader is None:
+            self._reader = open(self.path, 'rb')
+        self._reader.seek(self._offsets[i])
+        entry = json.loads(self._reader.readline())
+        if entry['key'] != key:
+            return None
+        self._looked_up[i >> 3] |= 1 << (i & 7)
+        return entry['checked']
+
+    def record(self, key, checked):
+        """
+        Journals a name's results if they are final.
+        """
+        if not is_resolved(checked):
+            return
+        self.recorded += 1
+        self._buffer.append(json.dumps({'key': key, 'checked': checked}, ensure_ascii=False) + '\n')
+        if (len(self._buffer) >= self.batch_size
+                or time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        """
+        Writes buffered records in one go and syncs them to disk.
+        """
+        if self._buffer:
+            self._file.write(''.join(self._buffer))
+            self._buffer = []
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        self.flush()
+        self._file.close()
+        if self._reader is not None:
+            self._reader.close()
+
+    def discard(self):
+        """
+        Closes the journal once a run has completed and drops the run's
+        entries: the names it recorded or looked up. Entries of other runs
+        sharing the file (other domains or inputs) are kept; the file is
+        deleted when none remain.
+        """
+        if not self._file.closed:
+            self.close()
+        looked_up = self._looked_up
+        kept = sorted(offset for i, offset in enumerate(self._offsets) if not looked_up[i >> 3] & (1 << (i & 7)))
+        if not kept:
+            os.remove(self.path)
+            return
+        temporary = self.path + '.tmp'
+        with open(self.path, 'rb') as source, open(temporary, 'wb') as target:
+            for offset in kept:
+                source.seek(offset)
+                target.write(source.readline())
+            target.flush()
+            os.fsync(target.fileno())
+        os.replace(temporary, self.path)
+
+
+def identify_with_checkpoint(engine, keys, candidate_maps, journal, learner=None, on_result=None, plan=None,
+                             **kwargs):
+    """
+    Runs `engine.identify` for the names whose key is not yet in the journal
+    and journals each result as soon as it completes. Journaled hits also
+    seed the learner. `on_result(index, checked)` is called, with the index
+    in `keys`, for each name verified. Ambiguous addresses are judged over
+    all the names, journaled or not, unless a `plan` is given.
+    Returns the per-name results in input order.
+    """
+    results = [journal.get(key) for key in keys]
+    pending = [i for i, result in enumerate(results) if result is None]
+    if plan is None:
+        plan = CandidatePlan(candidate_maps)
+
+    if learner is not None:
+        for candidates, checked in zip(candidate_maps, results):
+            for style, verdict in (checked or {}).items():
+                if verdict and not plan.is_ambiguous(candidates[style]):
+                    learner.record(candidates[style].rsplit('@', 1)[-1], style)
+
+    def journal_result(index, checked):
+        journal.record(keys[pending[index]], checked)
+        if on_result is not None:
+            on_result(pending[index], checked)
+
+    checked = engine.identify([candidate_maps[i] for i in pending], learner=learner,
+                              on_result=journal_result, plan=plan, **kwargs)
+    for i, result in zip(pending, checked):
+        results[i] = result
+    return results
@@ -0,0 +1,202 @@
+import socket
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+# Bounds applied to the TTLs taken from DNS answers, in seconds
+MIN_TTL = 60
+MAX_TTL = 24 * 60 * 60
+# How long to remember failures and answers that carry no TTL
+NEGATIVE_TTL = 5 * 60
+
+# Name servers and mail hosts of domain parking services
+PARKING_SUFFIXES = (
+    'sedoparking.com', 'parkingcrew.net', 'bodis.com', 'above.com', 'parklogic.com',
+    'dan.com', 'afternic.com', 'hugedomains.com', 'domainparking.ru', 'parkpage.foundationapi.com',
+    'undeveloped.com', 'smartname.com', 'uniregistrymarket.link',
+)
+
+# Well-known throwaway mailbox providers
+DISPOSABLE_DOMAINS = frozenset((
+    'mailinator.com', 'guerrillamail.com', 'guerrillamail.net', 'sharklasers.com', 'grr.la',
+    '10minutemail.com', 'temp-mail.org', 'tempmail.com', 'yopmail.com', 'yopmail.fr',
+    'trashmail.com', 'getnada.com', 'dispostable.com', 'maildrop.cc', 'throwawaymail.com',
+    'fakeinbox.com', 'mintemail.com', 'mohmal.com', 'emailondeck.com', 'spamgourmet.com',
+))
+
+# Domain states. Only 'no_domain', 'null_mx' and 'no_mail' are dead.
+OK = 'ok'
+NO_DOMAIN = 'no_domain'
+NULL_MX = 'null_mx'
+NO_MAIL = 'no_mail'
+UNKNOWN = 'unknown'
+DEAD_STATES = (NO_DOMAIN, NULL_MX, NO_MAIL)
+
+
+class NoSuchDomain(Exception):
+    """
+    Raised by resolvers when a domain does not exist (NXDOMAIN).
+    """
+
+
+class DomainStatus(namedtuple('DomainStatus', 'domain status mx_hosts flags expires')):
+    """
+    Pre-flight result for a domain: its state, the hosts mail for it goes
+    to (best first), flags such as 'parked' or 'disposable', and when the
+    result expires (time.monotonic() value).
+    """
+    __slots__ = ()
+
+    @property
+    def accepts_mail(self):
+        return self.status not in DEAD_STATES
+
+
+class DnsPythonResolver:
+    """
+    Resolver backed by dnspython.
+    resolve(domain, rdtype) returns (records, ttl): (preference, host)
+    pairs for MX, host names for NS and addresses for A. An empty list means
+    the domain exists but has no such record.
+    """
+    def __init__(self, timeout=5.0):
+        import dns.resolver
+
+        self._dns = dns.resolver
+        self._resolver = dns.resolver.Resolver()
+        self._resolver.lifetime = timeout
+
+    def resolve(self, domain, rdtype):
+        try:
+            answers = self._resolver.resolve(domain, rdtype)
+        except self._dns.NXDOMAIN:
+            raise NoSuchDomain(domain)
+        except self._dns.NoAnswer:
+            return [], NEGATIVE_TTL
+        ttl = answers.rrset.ttl
+        if rdtype == 'MX':
+            return [(answer.preference, str(answer.exchange).rstrip('.')) for answer in answers], ttl
+        if rdtype == 'NS':
+            return [str(answer.target).rstrip('.') for answer in answers], ttl
+        return [answer.to_text() for answer in answers], ttl
+
+
+class SocketResolver:
+    """
+    Fallback resolver using the system resolver. It cannot query MX or NS
+    records, so the domain's own address stands in for its mail host.
+    """
+    def resolve(self, domain, rdtype):
+        if rdtype == 'NS':
+            return [], NEGATIVE_TTL
+        try:
+            addresses = {info[4][0] for info in socket.getaddrinfo(domain, None)}
+        except socket.gaierror as e:
+            if e.errno == socket.EAI_NONAME:
+                raise NoSuchDomain(domain)
+            raise
+        if rdtype == 'MX':
+            return [(0, domain)], NEGATIVE_TTL
+        return sorted(addresses), NEGATIVE_TTL
+
+
+def default_resolver():
+    """
+    Returns a dnspython resolver when dnspython is installed, otherwise the system resolver.
+    """
+    try:
+        return DnsPythonResolver()
+    except ImportError:
+        return SocketResolver()
+
+
+class DomainPreflight:
+    """
+    Resolves each distinct domain once before any verification and caches
+    the result for the TTL of the DNS answers. Dead domains (no such domain,
+    null MX, or neither MX nor address) can then be skipped without spending
+    verification calls; parked and disposable domains are flagged.
+    The resolver is injectable so the stage can run offline.
+    """
+    def __init__(self, resolver=None, disposable_domains=DISPOSABLE_DOMAINS, parking_suffixes=PARKING_SUFFIXES,
+                 workers=8):
+        self.resolver = resolver if resolver is not None else default_resolver()
+        self.disposable_domains = frozenset(disposable_domains)
+        self.parking_suffixes = tuple(parking_suffixes)
+        self.workers = workers
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _matches(host, suffixes):
+        host = host.lower().rstrip('.')
+        return any(host == suffix or host.endswith('.' + suffix) for suffix in suffixes)
+
+    def _lookup(self, domain):
+        flags = set()
+        if domain in self.disposable_domains:
+            flags.add('disposable')
+        try:
+            mx_records, ttl = self.resolver.resolve(domain, 'MX')
+            ttls = [ttl]
+            if mx_records:
+                hosts = [host for _, host in sorted(mx_records)]
+                if not any(hosts):
+                    # RFC 7505 null MX: the domain explicitly accepts no mail
+                    return NULL_MX, [], flags, ttls
+            else:
+                # No MX: mail goes to the domain's own address, if it has one
+                addresses, ttl = self.resolver.resolve(domain, 'A')
+                ttls.append(ttl)
+                if not addresses:
+                    return NO_MAIL, [], flags, ttls
+                hosts = [domain]
+            name_servers, ttl = self.resolver.resolve(domain, 'NS')
+            ttls.append(ttl)
+        except NoSuchDomain:
+            return NO_DOMAIN, [], flags, [NEGATIVE_TTL]
+        except Exception:
+            # Transient DNS failure: don't block verification on it
+            return UNKNOWN, [domain], flags, [NEGATIVE_TTL]
+
+        hosts = [host for host in hosts if host]
+        if any(self._matches(host, self.parking_suffixes) for host in hosts + list(name_servers)):
+            flags.add('parked')
+        if any(self._matches(host, self.disposable_domains) for host in hosts):
+            flags.add('disposable')
+        return OK, hosts, flags, ttls
+
+    def check(self, domain):
+        """
+        Returns the DomainStatus of a domain, from the cache while it is fresh.
+        """
+        domain = domain.strip().lower()
+        now = time.monotonic()
+        with self._lock:
+            cached = self._cache.get(domain)
+        if cached is not None and cached.expires > now:
+            return cached
+
+        status, hosts, flags, ttls = self._lookup(domain)
+        ttl = min(max(min(ttls), MIN_TTL), MAX_TTL)
+        result = DomainStatus(domain, status, hosts, frozenset(flags), now + ttl)
+        with self._lock:
+            self._cache[domain] = result
+        return result
+
+    def check_many(self, domains):
+        """
+        Resolves every distinct domain (concurrently) and returns {domain: DomainStatus}.
+        """
+        unique = list(dict.fromkeys(domain.strip().lower() for domain in domains))
+        if len(unique) <= 1:
+            return {domain: self.check(domain) for domain in unique}
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(unique))) as executor:
+            return dict(zip(unique, executor.map(self.check, unique)))
+
+    def mx_hosts(self, domain):
+        """
+        Returns the domain's mail hosts (empty for dead domains), for SmtpVerifier.
+        """
+        return self.check(domain).mx_hosts
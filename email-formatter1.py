@@ -1,125 +1,11 @@
-import re
-import smtplib
+import sys
 from email_validator import validate_email, EmailNotValidError
-
-def format_email_addresses(names, domain, style):
-    """
-    Formats email addresses according to the specified style.
-    """
-    emails = []
-    for name in names:
-        parts = name.strip().lower().split()
-        if len(parts) < 2:
-            # If only one word, consider it as first name
-            firstname = parts[0]
-            lastname = ""
-        else:
-            # Handle compound first names and last name
-            lastname = parts[-1]  # Take the last word as lastname
-            firstname_parts = parts[:-1]  # All words except the last one are part of the firstname
-            firstname = '-'.join(firstname_parts)  # Join firstname parts with hyphens
-        
-        email = ""
-        if style == 'firstname.lastname':
-            email = f"{firstname}.{lastname}@{domain}"
-        elif style == 'f.lastname':
-            email = f"{firstname[0]}.{lastname}@{domain}"
-        elif style == 'firstname.l':
-            email = f"{firstname}.{lastname[0]}@{domain}"
-        elif style == 'firstnamelastname':
-            email = f"{firstname}{lastname}@{domain}"
-        elif style == 'flastname':
-            email = f"{firstname[0]}{lastname}@{domain}"
-        elif style == 'lastname.firstname':
-            email = f"{lastname}.{firstname}@{domain}"
-        elif style == 'l.firstname':
-            email = f"{lastname[0]}.{firstname}@{domain}"
-        elif style == 'initials':
-            email = f"{firstname[0]}{lastname[0]}@{domain}"
-        
-        # Clean the email (preserve hyphens, remove other special characters)
-        email = re.sub(r'[^a-z0-9.@-]', '', email)
-        # Remove consecutive hyphens and ensure hyphens aren't at start/end of parts
-        parts = email.split('@')
-        local_part = re.sub(r'-+', '-', parts[0]).strip('-')
-        domain = re.sub(r'-+', '-', parts[1]).strip('-')
-        email = f"{local_part}@{domain}"
-        emails.append(email)
-    
-    return emails
-
-def format_email_all_styles(names, domain):
-    """
-    Generates all email address variants for each name.
-    """
-    styles = {
-        'firstname.lastname': [],
-        'f.lastname': [],
-        'firstname.l': [],
-        'firstnamelastname': [],
-        'flastname': [],
-        'lastname.firstname': [],
-        'l.firstname': [],
-        'initials': []
-    }
-    
-    for style in styles.keys():
-        styles[style] = format_email_addresses(names, domain, style)
-    
-    return styles
-
-def test_email_delivery(email):
-    """
-    Tests email deliverability using Abstract API.
-    """
-    import requests
-
-    api_key = 'API KEY HERE --------->>>>>>'                       # Replace with your API key
-    api_url = f'https://emailvalidation.abstractapi.com/v1/?api_key={api_key}&email={email}'
-
-    try:
-        response = requests.get(api_url)
-        if response.status_code == 200:
-            data = response.json()
-            # Check if the email is deliverable and has valid format
-            if data.get('deliverability') == 'DELIVERABLE' and data.get('is_valid_format').get('value'):
-                return email
-        return None
-    except Exception:
-        return None
-
-def identify_valid_email(names, domain):
-    """
-    Identifies the best valid email address among the generated formats.
-    """
-    all_formats = format_email_all_styles(names, domain)
-    valid_emails = {}
-    
-    for i, name in enumerate(names):
-        for style, emails in all_formats.items():
-            email = emails[i]
-            if test_email_delivery(email):
-                valid_emails[name] = email
-                break  # Takes the first valid address found
-    
-    return valid_emails
-
-def validate_email_regex(email):
-    """
-    Validates email address using regex pattern.
-    Returns True if email is valid, False otherwise.
-    """
-    # Allow hyphens in both local part and domain, but not at start/end of parts
-    pattern = r'^[a-zA-Z0-9][a-zA-Z0-9.-]*[a-zA-Z0-9]@(?!-)[a-zA-Z0-9][a-zA-Z0-9-]*[a-zA-Z0-9](\.[a-zA-Z0-9][a-zA-Z0-9-]*[a-zA-Z0-9])*\.[a-zA-Z]{2,}$'
-    if re.match(pattern, email):
-        # Additional checks
-        if len(email) <= 254:  # Maximum length check
-            local_part = email.split('@')[0]
-            if len(local_part) <= 64:  # Local part length check
-                # Ensure no consecutive hyphens
-                if '--' not in local_part and '--' not in email.split('@')[1]:
-                    return True
-    return False
+from email_core import (
+    FORMAT_OPTIONS, describe_domain_status, domain_preflight, format_email_addresses,
+    format_email_all_styles, identify_valid_email, infer_patterns, parse_known_pair, validate_many
+)
+from metrics import Metrics
+import batch_pipeline
 
 def format_emails_from_input():
     """
@@ -148,27 +34,47 @@ def format_emails_from_input():
     print("9. Test all options and identify the correct address")
     print("10. Display all options without validity testing")
     print("11. Validate emails using regex (offline validation)")
+    print("12. Identify the correct address, learning the domain's format (fewer API calls)")
+    print("13. Infer the format from known addresses at this domain (no API calls)")
     
-    format_choice = input("Enter your choice (1-11): ")
-    format_options = {
-        '1': 'firstname.lastname',
-        '2': 'f.lastname',
-        '3': 'firstname.l',
-        '4': 'firstnamelastname',
-        '5': 'flastname',
-        '6': 'lastname.firstname',
-        '7': 'l.firstname',
-        '8': 'initials'
-    }
+    format_choice = input("Enter your choice (1-13): ")
     
     emails_list = []
     
-    if format_choice == '9':
-        valid_emails = identify_valid_email(names, domain)
+    if format_choice in ('9', '12'):
+        warning = describe_domain_status(domain_preflight().check(domain))
+        if warning:
+            print(f"\n{warning}")
+        metrics = Metrics()
+        valid_emails = identify_valid_email(names, domain, learn_patterns=format_choice == '12', metrics=metrics)
         print("\nIdentified valid email addresses:")
         for name, email in valid_emails.items():
             print(f"{name}: {email}")
             emails_list.append(email)
+        print(f"\n{metrics.summary()}")
+    elif format_choice == '13':
+        known_input = input("Enter known addresses as 'name, email' (one per line, press Enter twice to finish):\n")
+        known_pairs = []
+        while known_input:
+            pair = parse_known_pair(known_input)
+            if pair:
+                known_pairs.append(pair)
+            else:
+                print(f"Skipped (expected 'name, email'): {known_input}")
+            known_input = input()
+        index = infer_patterns(known_pairs)
+        pattern = index.pattern(domain)
+        if pattern is None:
+            print(f"\nNo pattern could be inferred for {domain} from the known addresses")
+        else:
+            print(f"\nInferred pattern: {pattern.template}"
+                  f" (matches {pattern.matched} of {pattern.total} known addresses)")
+            print("\nInferred email addresses:")
+            for name in names:
+                email = index.generate(name, domain)
+                if email:
+                    print(f"{name}: {email}")
+                    emails_list.append(email)
     elif format_choice == '10':
         all_formats = format_email_all_styles(names, domain)
         print("\nAll possible email addresses (without validity testing):")
@@ -180,17 +86,18 @@ def format_emails_from_input():
     elif format_choice == '11':
         all_formats = format_email_all_styles(names, domain)
         print("\nValidating all possible email formats using regex:")
+        validity = {style: validate_many(emails) for style, emails in all_formats.items()}
         for i, name in enumerate(names):
             print(f"\nFor {name}:")
             for style, emails in all_formats.items():
                 email = emails[i]
-                is_valid = validate_email_regex(email)
+                is_valid = validity[style][i]
                 status = "✓ Valid" if is_valid else "✗ Invalid"
                 print(f"{style}: {email} - {status}")
                 if is_valid:
                     emails_list.append(email)
     else:
-        email_format = format_options.get(format_choice, 'firstname.lastname')
+        email_format = FORMAT_OPTIONS.get(format_choice, 'firstname.lastname')
         formatted_emails = format_email_addresses(names, domain, email_format)
         print("\nFormatted email addresses:")
         for email in formatted_emails:
@@ -212,4 +119,12 @@ def format_emails_from_input():
                 print(f"Failed to copy to clipboard: {str(e)}")
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == 'batch':
+        sys.exit(batch_pipeline.main(sys.argv[2:], prog='email-formatter1.py batch'))
+    if len(sys.argv) > 1 and sys.argv[1] == 'index':
+        import known_addresses
+        sys.exit(known_addresses.main(sys.argv[2:], prog='email-formatter1.py index'))
+    if len(sys.argv) > 1 and sys.argv[1] == 'serve':
+        import service
+        sys.exit(service.main(sys.argv[2:], prog='email-formatter1.py serve'))
     format_emails_from_input()
\ No newline at end of file
@@ -0,0 +1,332 @@
+import os
+import re
+
+from async_verifier import AdaptiveRateLimiter, AsyncVerificationEngine
+from candidate_plan import CandidatePlan
+from checkpoint import CheckpointJournal, identify_with_checkpoint, is_resolved, journal_key
+from dns_preflight import NO_DOMAIN, NULL_MX, DomainPreflight
+from email_generator import generate_emails
+from known_addresses import KnownAddressIndex
+from metrics import Metrics
+from normalize_chars import normalize_accented_chars
+from pattern_inference import PatternIndex
+from pattern_learner import PatternLearner
+from smtp_verifier import SmtpVerifier
+from verification_cache import VerificationCache
+from verifier_clients import AbstractApiClient, MockVerifier, ZeroBounceClient
+
+# The backend and the API key can also be set with the EMAIL_FINDER_VERIFIER
+# and EMAIL_FINDER_API_KEY environment variables, which take precedence.
+VERIFIER_BACKEND = os.environ.get('EMAIL_FINDER_VERIFIER', 'abstract')   # See VERIFIER_BACKENDS
+API_KEY = os.environ.get('EMAIL_FINDER_API_KEY', 'API KEY HERE --------->>>>>>')  # Replace with your API key
+API_RATE_LIMIT = 1                                              # Requests per second allowed by your API plan
+API_MAX_RATE = None                                             # Highest rate the limiter may speed up to (None: twice API_RATE_LIMIT)
+API_MAX_RETRIES = 3                                             # Retries of a check answered with 429 or a server error
+API_CONCURRENCY = 10                                            # Maximum checks in flight at once
+DOMAIN_CONCURRENCY = None                                       # Names verified at once per target domain (None: no limit)
+DOMAIN_RATE = None                                              # Checks per second per target domain, slowing on failures (None: no limit)
+DOMAIN_WEIGHTS = {}                                             # Extra turns for some domains in mixed batches, e.g. {'bigcorp.com': 3}
+CACHE_PATH = 'verification_cache.sqlite3'                       # Where verification verdicts are cached between runs
+CHECKPOINT_PATH = 'verification_checkpoint.jsonl'               # Progress journal, so an interrupted run can resume
+KNOWN_INDEX_PATH = 'known_addresses.idx'                        # Index of past confirmed/bounced addresses, used when present
+SMTP_HELO_HOST = None                                           # Host name announced to mail servers (None: this machine's name)
+SMTP_MAIL_FROM = ''                                             # Sender used for SMTP probes ('' sends the null sender <>)
+METRICS_PATH = None                                             # Write run metrics here: .json, or Prometheus text format (None: off)
+INFERENCE_MIN_CONFIDENCE = 0.5                                  # Share of a domain's known addresses its inferred pattern must reproduce
+
+VERIFIER_BACKENDS = {
+    'abstract': "Abstract API, one address per request",
+    'zerobounce': "ZeroBounce batch API, up to 100 addresses per request",
+    'smtp': "RCPT TO probes against each domain's mail servers, no API needed",
+    'mock': "Local mock provider for tests and dry runs: no network, every address undeliverable",
+}
+
+# Menu choices 1-8 shared by the CLI and the GUI
+FORMAT_OPTIONS = {
+    '1': 'firstname.lastname',
+    '2': 'f.lastname',
+    '3': 'firstname.l',
+    '4': 'firstnamelastname',
+    '5': 'flastname',
+    '6': 'lastname.firstname',
+    '7': 'l.firstname',
+    '8': 'initials'
+}
+
+# Letters, digits, dots and hyphens, but no hyphen or dot at the start/end of
+# the local part or of a domain label, and no consecutive hyphens anywhere.
+# The lookaheads enforce the 254 character total and 64 character local part limits.
+EMAIL_PATTERN = re.compile(
+    r'(?=.{1,254}\Z)(?=[^@]{1,64}@)(?!.*--)'
+    r'[a-zA-Z0-9][a-zA-Z0-9.-]*[a-zA-Z0-9]'
+    r'@(?!-)[a-zA-Z0-9][a-zA-Z0-9-]*[a-zA-Z0-9](?:\.[a-zA-Z0-9][a-zA-Z0-9-]*[a-zA-Z0-9])*\.[a-zA-Z]{2,}'
+)
+
+# Finds addresses in free text (used to copy results)
+EMAIL_SEARCH_PATTERN = re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
+
+_api_limiter = None
+_preflight = None
+
+
+def format_email_addresses(names, domain, style):
+    """
+    Formats email addresses according to the specified style.
+    Accented characters in names are transliterated first.
+    """
+    return generate_emails(names, domain, [style], normalize=normalize_accented_chars)[style]
+
+
+def format_email_all_styles(names, domain):
+    """
+    Generates all email address variants for each name.
+    Each name is parsed once and all styles are rendered from it.
+    """
+    return generate_emails(names, domain, normalize=normalize_accented_chars)
+
+
+def infer_patterns(known_pairs):
+    """
+    Learns each domain's address pattern from known (name, email) pairs.
+    Returns a PatternIndex; its generate(name, domain) then gives addresses
+    on the learned domains without any verification call.
+    """
+    index = PatternIndex(normalize=normalize_accented_chars, min_confidence=INFERENCE_MIN_CONFIDENCE)
+    index.learn(known_pairs)
+    return index
+
+
+def parse_known_pair(line):
+    """
+    Parses a 'name, email' line (the last comma separates them).
+    Returns (name, email), or None when the line has no address.
+    """
+    name, _, email = line.rpartition(',')
+    name, email = name.strip(), email.strip()
+    if not name or '@' not in email:
+        return None
+    return name, email
+
+
+def validate_email_regex(email):
+    """
+    Validates email address using regex pattern.
+    Returns True if email is valid, False otherwise.
+    """
+    return EMAIL_PATTERN.fullmatch(email) is not None
+
+
+def validate_many(emails):
+    """
+    Validates a whole list of addresses in one call.
+    Returns a list of booleans in the same order.
+    """
+    return [match is not None for match in map(EMAIL_PATTERN.fullmatch, emails)]
+
+
+def api_limiter():
+    """
+    Returns the rate limiter shared by every API call in the process.
+    It starts at API_RATE_LIMIT and adapts to the provider's answers.
+    """
+    global _api_limiter
+    if _api_limiter is None:
+        _api_limiter = AdaptiveRateLimiter(API_RATE_LIMIT, max_rate=API_MAX_RATE)
+    return _api_limiter
+
+
+def make_verifier_client(metrics=None):
+    """
+    Builds the client of the configured VERIFIER_BACKEND.
+    API clients share the adaptive rate limiter and keep their connections alive.
+    """
+    if VERIFIER_BACKEND == 'abstract':
+        return AbstractApiClient(API_KEY, pool_size=API_CONCURRENCY, metrics=metrics,
+                                 limiter=api_limiter(), max_retries=API_MAX_RETRIES)
+    if VERIFIER_BACKEND == 'zerobounce':
+        return ZeroBounceClient(API_KEY, pool_size=API_CONCURRENCY, metrics=metrics,
+                                limiter=api_limiter(), max_retries=API_MAX_RETRIES)
+    if VERIFIER_BACKEND == 'smtp':
+        # No API quota to respect when probing mail servers directly
+        return SmtpVerifier(helo_host=SMTP_HELO_HOST, mail_from=SMTP_MAIL_FROM,
+                            resolve=domain_preflight().mx_hosts, metrics=metrics)
+    if VERIFIER_BACKEND == 'mock':
+        return MockVerifier()
+    raise ValueError(f"Unknown verifier backend {VERIFIER_BACKEND!r}; choose one of {', '.join(VERIFIER_BACKENDS)}")
+
+
+def domain_preflight():
+    """
+    Returns the shared DNS pre-flight stage, so each domain is resolved once per process.
+    """
+    global _preflight
+    if _preflight is None:
+        _preflight = DomainPreflight()
+    return _preflight
+
+
+def describe_domain_status(status):
+    """
+    Returns a warning about a DomainStatus, or None when there is nothing to report.
+    """
+    if status.status == NO_DOMAIN:
+        problem = "does not exist"
+    elif status.status == NULL_MX:
+        problem = "does not accept email (null MX record)"
+    elif not status.accepts_mail:
+        problem = "has no mail server"
+    elif 'disposable' in status.flags:
+        problem = "is a disposable email provider"
+    elif 'parked' in status.flags:
+        problem = "looks like a parked domain"
+    else:
+        return None
+    return f"Warning: {status.domain} {problem}"
+
+
+def make_verification_engine(metrics=None):
+    """
+    Builds the verification engine from the settings above, recording into
+    `metrics` when given. Candidates found in the known-address index at
+    KNOWN_INDEX_PATH (when that file exists) are resolved without verification.
+    The mock backend gets a throwaway in-memory cache instead of CACHE_PATH.
+    Returns the engine and a function that releases its connections, cache and index.
+    """
+    # API clients pace themselves with the shared adaptive limiter
+    client = make_verifier_client(metrics)
+    # Mock verdicts are made up: keep them in memory, out of the cache real runs read
+    cache = VerificationCache(':memory:' if VERIFIER_BACKEND == 'mock' else CACHE_PATH)
+    known = KnownAddressIndex(KNOWN_INDEX_PATH) if KNOWN_INDEX_PATH and os.path.exists(KNOWN_INDEX_PATH) else None
+    # Mixed-domain batches are interleaved across domains, within the per-domain limits
+    engine = AsyncVerificationEngine(client, concurrency=API_CONCURRENCY, cache=cache, metrics=metrics, known=known,
+                                     domain_concurrency=DOMAIN_CONCURRENCY, domain_rate=DOMAIN_RATE,
+                                     domain_weights=DOMAIN_WEIGHTS)
+
+    def close():
+        client.close()
+        cache.close()
+        if known is not None:
+            known.close()
+
+    return engine, close
+
+
+def _style_results(candidates, checked, plan):
+    # One name's {style: {'email', 'is_valid', 'checked', 'ambiguous'}}
+    return {
+        style: {
+            'email': email,
+            'is_valid': bool(checked.get(style)),
+            'checked': style in checked,
+            'ambiguous': plan.is_ambiguous(email)
+        }
+        for style, email in candidates.items()
+    }
+
+
+def check_all_styles(names, domain, learn_patterns=False, stop_at_first=True,
+                     checkpoint_path=CHECKPOINT_PATH, progress=None, cancel=None, metrics=None, on_result=None):
+    """
+    Tests the generated formats of every name and returns validation results:
+    {name: {style: {'email', 'is_valid', 'checked', 'ambiguous'}}}.
+    Each distinct address is verified once. An address generated for several
+    different names is 'ambiguous': even when deliverable, it is not assigned
+    to any of them, and their other formats are tried.
+    The domain is resolved first: when it cannot receive mail, every format is
+    reported invalid without any verification call.
+    All checks run concurrently within the configured API rate limit.
+    With stop_at_first, each name stops at its first valid format; formats
+    that were not tested are reported with 'checked' set to False.
+    With learn_patterns, the domain's winning format is learned from the first
+    confirmed hits and tried first (then exclusively) for the remaining names.
+    Progress is journaled to checkpoint_path, so a restarted run skips the names
+    already resolved; once every name is resolved their entries are dropped
+    (other domains' entries stay, and the file goes when it is empty).
+    progress(done) is called with the number of names done so far, and
+    on_result(name, results) with each name's results as soon as it is
+    verified (not for journaled names, nor for those of a dead domain).
+    Setting the `cancel` event stops the run early.
+    With a Metrics object, stage timings, API latency and cache hits are
+    recorded into it and written to METRICS_PATH when that is set.
+    """
+    if metrics is None:
+        metrics = Metrics()
+    try:
+        return _check_all_styles(names, domain, learn_patterns, stop_at_first, checkpoint_path,
+                                 progress, cancel, metrics, on_result)
+    finally:
+        if METRICS_PATH:
+            metrics.write(METRICS_PATH)
+
+
+def _check_all_styles(names, domain, learn_patterns, stop_at_first, checkpoint_path, progress, cancel, metrics,
+                      on_result):
+    with metrics.timer('generate'):
+        all_formats = format_email_all_styles(names, domain)
+    with metrics.timer('preflight'):
+        accepts_mail = domain_preflight().check(domain).accepts_mail
+    if not accepts_mail:
+        return {
+            name: {style: {'email': emails[i], 'is_valid': False, 'checked': True, 'ambiguous': False}
+                   for style, emails in all_formats.items()}
+            for i, name in enumerate(names)
+        }
+    candidates = [{style: emails[i] for style, emails in all_formats.items()} for i in range(len(names))]
+    with metrics.timer('plan'):
+        plan = CandidatePlan(candidates)
+
+    engine, close = make_verification_engine(metrics)
+    learner = PatternLearner() if learn_patterns else None
+    journal = CheckpointJournal(checkpoint_path) if checkpoint_path else None
+    done = 0
+
+    def on_name(index, result):
+        nonlocal done
+        done += 1
+        if on_result is not None:
+            on_result(names[index], _style_results(candidates[index], result, plan))
+        if progress is not None:
+            progress(done)
+
+    try:
+        with metrics.timer('verify'):
+            if journal is not None:
+                keys = [journal_key(name, domain) for name in names]
+                done = sum(1 for key in keys if key in journal)
+                if progress is not None:
+                    progress(done)
+                checked = identify_with_checkpoint(engine, keys, candidates, journal, learner=learner,
+                                                   on_result=on_name, plan=plan, stop_at_first=stop_at_first,
+                                                   cancel=cancel)
+            else:
+                checked = engine.identify(candidates, learner=learner, on_result=on_name,
+                                          stop_at_first=stop_at_first, cancel=cancel, plan=plan)
+    finally:
+        close()
+        if journal is not None:
+            journal.close()
+
+    # Names cut short by `cancel` hold partial verdicts and were not counted as done
+    if journal is not None and done == len(names) and all(is_resolved(results) for results in checked):
+        journal.discard()
+
+    return {name: _style_results(candidates[i], checked[i], plan) for i, name in enumerate(names)}
+
+
+def identify_valid_email(names, domain, learn_patterns=False, checkpoint_path=CHECKPOINT_PATH,
+                         progress=None, cancel=None, metrics=None):
+    """
+    Identifies the best valid email address among the generated formats.
+    Returns {name: email} for the names where a deliverable format was found
+    that is not shared with another name. See check_all_styles for the options.
+    """
+    validation_results = check_all_styles(names, domain, learn_patterns=learn_patterns, stop_at_first=True,
+                                          checkpoint_path=checkpoint_path, progress=progress, cancel=cancel,
+                                          metrics=metrics)
+    valid_emails = {}
+    for name, formats in validation_results.items():
+        for result in formats.values():
+            if result['is_valid'] and not result['ambiguous']:
+                valid_emails[name] = result['email']  # Takes the first valid address found
+                break
+    return valid_emails
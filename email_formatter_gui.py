@@ -1,122 +1,17 @@
-import re
+import queue
+import threading
 import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
 from tkinter import ttk, scrolledtext
 from email_validator import validate_email, EmailNotValidError
-from normalize_chars import normalize_accented_chars
+from email_core import (
+    EMAIL_SEARCH_PATTERN, FORMAT_OPTIONS, check_all_styles, describe_domain_status, domain_preflight,
+    format_email_addresses, format_email_all_styles, validate_many
+)
+from metrics import Metrics
 
-def format_email_addresses(names, domain, style):
-    """
-    Format email addresses according to the specified style.
-    """
-    emails = []
-    for name in names:
-        # Normalize accented characters in the name
-        name = normalize_accented_chars(name)
-        parts = name.strip().lower().split()
-        if len(parts) < 2:
-            # If single word, consider it as firstname
-            firstname = parts[0]
-            lastname = ""
-        else:
-            # Handle compound first names and last name
-            lastname = parts[-1]  # Take the last word as lastname
-            firstname_parts = parts[:-1]  # All words except the last one are part of the firstname
-            firstname = '-'.join(firstname_parts)  # Join firstname parts with hyphens
-        
-        email = ""
-        if style == 'firstname.lastname':
-            email = f"{firstname}.{lastname}@{domain}"
-        elif style == 'f.lastname':
-            email = f"{firstname[0]}.{lastname}@{domain}"
-        elif style == 'firstname.l':
-            email = f"{firstname}.{lastname[0]}@{domain}"
-        elif style == 'firstnamelastname':
-            email = f"{firstname}{lastname}@{domain}"
-        elif style == 'flastname':
-            email = f"{firstname[0]}{lastname}@{domain}"
-        elif style == 'lastname.firstname':
-            email = f"{lastname}.{firstname}@{domain}"
-        elif style == 'l.firstname':
-            email = f"{lastname[0]}.{firstname}@{domain}"
-        elif style == 'initials':
-            email = f"{firstname[0]}{lastname[0]}@{domain}"
-        
-        # Clean email (preserve hyphens, remove other special characters)
-        email = re.sub(r'[^a-z0-9.@-]', '', email)
-        # Remove consecutive hyphens and ensure hyphens aren't at start/end of parts
-        parts = email.split('@')
-        local_part = re.sub(r'-+', '-', parts[0]).strip('-')
-        domain = re.sub(r'-+', '-', parts[1]).strip('-')
-        email = f"{local_part}@{domain}"
-        emails.append(email)
-    
-    return emails
-
-def format_email_all_styles(names, domain):
-    """
-    Generate all email address variants for each name.
-    """
-    styles = {
-        'firstname.lastname': [],
-        'f.lastname': [],
-        'firstname.l': [],
-        'firstnamelastname': [],
-        'flastname': [],
-        'lastname.firstname': [],
-        'l.firstname': [],
-        'initials': []
-    }
-    
-    for style in styles.keys():
-        styles[style] = format_email_addresses(names, domain, style)
-    
-    return styles
-
-def test_email_delivery(email):
-    """
-    Tests email deliverability using Abstract API.
-    """
-    import requests
-    import time
-
-    api_key = 'API KEY HERE --------->>>>>>'                    # Replace with your API key
-    api_url = f'https://emailvalidation.abstractapi.com/v1/?api_key={api_key}&email={email}'
-
-    try:
-        # Add delay to respect API rate limits
-        time.sleep(1)
-        response = requests.get(api_url)
-        if response.status_code == 200:
-            data = response.json()
-            # Check if the email is deliverable and has valid format
-            if data.get('deliverability') == 'DELIVERABLE' and data.get('is_valid_format').get('value'):
-                return email
-            elif response.status_code == 429:  # Rate limit exceeded
-                time.sleep(60)  # Wait for 60 seconds before retrying
-                return test_email_delivery(email)  # Retry the request
-        return None
-    except Exception as e:
-        print(f"Error testing email {email}: {str(e)}")
-        return None
-
-def identify_valid_email(names, domain):
-    """
-    Tests all possible email formats and returns validation results.
-    """
-    all_formats = format_email_all_styles(names, domain)
-    validation_results = {}
-    
-    for i, name in enumerate(names):
-        validation_results[name] = {}
-        for style, emails in all_formats.items():
-            email = emails[i]
-            is_valid = test_email_delivery(email)
-            validation_results[name][style] = {
-                'email': email,
-                'is_valid': bool(is_valid)
-            }
-    
-    return validation_results
+POLL_INTERVAL_MS = 100                                          # How often the window picks up results from the worker
+RENDER_BATCH = 500                                              # Names rendered per text update
 
 class EmailFormatterApp:
     def __init__(self, root):
@@ -127,6 +22,12 @@ class EmailFormatterApp:
         
         # Variables
         self.format_var = tk.StringVar(value="1")
+        self.progress_var = tk.DoubleVar(value=0)
+        
+        # Processing runs on a worker thread, which posts results to this queue
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.results_queue = queue.Queue()
+        self.cancel_event = threading.Event()
         
         # Create main frames
         self.create_input_frame()
@@ -138,6 +39,8 @@ class EmailFormatterApp:
         self.status_bar = ttk.Label(root, textvariable=self.status_var, relief=tk.SUNKEN, anchor=tk.W)
         self.status_bar.pack(side=tk.BOTTOM, fill=tk.X)
         
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        
     def create_input_frame(self):
         input_frame = ttk.LabelFrame(self.root, text="Data Input")
         input_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
@@ -174,7 +77,8 @@ class EmailFormatterApp:
             ("8. initials (ex: jd)", "8"),
             ("9. Test all options and identify the correct address", "9"),
             ("10. Show all options without validity test", "10"),
-            ("11. Validate emails using regex (offline validation)", "11")
+            ("11. Validate emails using regex (offline validation)", "11"),
+            ("12. Identify the correct address, learning the domain's format", "12")
         ]
         
         for i, (text, value) in enumerate(formats):
@@ -182,10 +86,15 @@ class EmailFormatterApp:
                 row=i // 2, column=i % 2, sticky=tk.W, padx=5, pady=2
             )
         
-        # Process button
-        ttk.Button(options_frame, text="Generate email addresses", command=self.process_emails).grid(
-            row=5, column=0, columnspan=2, pady=10
-        )
+        # Process and cancel buttons
+        self.generate_button = ttk.Button(options_frame, text="Generate email addresses", command=self.process_emails)
+        self.generate_button.grid(row=6, column=0, sticky=tk.E, padx=5, pady=10)
+        self.cancel_button = ttk.Button(options_frame, text="Cancel", command=self.cancel_processing, state=tk.DISABLED)
+        self.cancel_button.grid(row=6, column=1, sticky=tk.W, padx=5, pady=10)
+        
+        # Progress bar
+        self.progress_bar = ttk.Progressbar(options_frame, variable=self.progress_var, mode='determinate')
+        self.progress_bar.grid(row=7, column=0, columnspan=2, sticky=tk.EW, padx=5, pady=(0, 5))
         
         # Configure grid
         options_frame.columnconfigure(0, weight=1)
@@ -210,8 +119,7 @@ class EmailFormatterApp:
         """Extract and copy only the email addresses from the results."""
         content = self.result_text.get(1.0, tk.END)
         # Extract email addresses using regex
-        email_pattern = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
-        emails = re.findall(email_pattern, content)
+        emails = EMAIL_SEARCH_PATTERN.findall(content)
         
         if emails:
             # Join emails with newlines and copy to clipboard
@@ -223,9 +131,6 @@ class EmailFormatterApp:
             self.status_var.set("No emails found to copy")
     
     def process_emails(self):
-        # Allow hyphens in domain name but not at start or end
-        # Allow hyphens in domain name but not at start or end
-        pattern = r'^[a-zA-Z0-9._%+-]+@(?!-)[a-zA-Z0-9-]+(?<!-)(\.[a-zA-Z0-9-]+(?<!-))*\.[a-zA-Z]{2,}$'
         # Clear previous results
         self.result_text.delete(1.0, tk.END)
         
@@ -242,66 +147,143 @@ class EmailFormatterApp:
         # Process names
         names = [name for name in names_input.split('\n') if name.strip()]
         
-        # Format options mapping
-        format_options = {
-            '1': 'firstname.lastname',
-            '2': 'f.lastname',
-            '3': 'firstname.l',
-            '4': 'firstnamelastname',
-            '5': 'flastname',
-            '6': 'lastname.firstname',
-            '7': 'l.firstname',
-            '8': 'initials'
-        }
-        
+        # Hand the work to the worker thread so the window stays responsive
+        self.cancel_event = threading.Event()
+        self.generate_button.config(state=tk.DISABLED)
+        self.cancel_button.config(state=tk.NORMAL)
+        self.progress_bar.config(maximum=len(names))
+        self.progress_var.set(0)
         self.status_var.set("Processing...")
-        self.root.update_idletasks()
+        self.executor.submit(self.run_job, format_choice, names, domain, self.cancel_event)
+        self.root.after(POLL_INTERVAL_MS, self.poll_results)
+    
+    def run_job(self, format_choice, names, domain, cancel_event):
+        """Runs on the worker thread. Never touches Tk: everything goes through the queue."""
+        post = self.results_queue.put
         
         try:
-            if format_choice == '9':
-                self.result_text.insert(tk.END, "Testing all possible email formats...\n\n")
-                emails_list = []
-                validation_results = identify_valid_email(names, domain)
-                self.result_text.insert(tk.END, "All possible email addresses with validation results:\n")
+            if format_choice in ('9', '12'):
+                post(('text', "Testing all possible email formats...\n\n"))
+                warning = describe_domain_status(domain_preflight().check(domain))
+                if warning:
+                    post(('text', f"{warning}\n\n"))
+                learn_patterns = format_choice == '12'
+                metrics = Metrics()
+                post(('text', "All possible email addresses with validation results:\n"))
+                # Each name is shown as soon as it is verified; the rest
+                # (already journaled, dead domain or cancelled) at the end
+                shown = set()
+
+                def show(name, formats):
+                    if name not in shown:
+                        shown.add(name)
+                        post(('text', self.render_validation(name, formats)))
+
+                validation_results = check_all_styles(
+                    names, domain, learn_patterns=learn_patterns, stop_at_first=learn_patterns,
+                    progress=lambda done: post(('progress', done)), cancel=cancel_event, metrics=metrics,
+                    on_result=show
+                )
                 for name, formats in validation_results.items():
-                    self.result_text.insert(tk.END, f"\nFor {name}:\n")
-                    for style, result in formats.items():
-                        status = "✓ Valid" if result['is_valid'] else "✗ Invalid"
-                        self.result_text.insert(tk.END, f"{style}: {result['email']} [{status}]\n")
-                        if result['is_valid']:
-                            emails_list.append(result['email'])
-                    
-            elif format_choice == '10':
-                all_formats = format_email_all_styles(names, domain)
-                self.result_text.insert(tk.END, "All possible email addresses (without validity test):\n")
-                for i, name in enumerate(names):
-                    self.result_text.insert(tk.END, f"\nFor {name}:\n")
-                    for style, emails in all_formats.items():
-                        self.result_text.insert(tk.END, f"{style}: {emails[i]}\n")
-            elif format_choice == '11':
-                all_formats = format_email_all_styles(names, domain)
-                self.result_text.insert(tk.END, "Validating all possible email formats using regex:\n")
-                for i, name in enumerate(names):
-                    self.result_text.insert(tk.END, f"\nFor {name}:\n")
-                    for style, emails in all_formats.items():
-                        email = emails[i]
-                        pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-                        is_valid = bool(re.match(pattern, email) and
-                                      len(email) <= 254 and
-                                      len(email.split('@')[0]) <= 64)
-                        status = "✓ Valid" if is_valid else "✗ Invalid"
-                        self.result_text.insert(tk.END, f"{style}: {email} - {status}\n")
+                    show(name, formats)
+                post(('text', f"\n{metrics.summary()}\n"))
             else:
-                email_format = format_options.get(format_choice, 'firstname.lastname')
-                formatted_emails = format_email_addresses(names, domain, email_format)
-                self.result_text.insert(tk.END, "Formatted email addresses:\n")
-                for i, email in enumerate(formatted_emails):
-                    self.result_text.insert(tk.END, f"{names[i]}: {email}\n")
-                    
-            self.status_var.set("Processing completed successfully")
+                if format_choice == '10':
+                    post(('text', "All possible email addresses (without validity test):\n"))
+                elif format_choice == '11':
+                    post(('text', "Validating all possible email formats using regex:\n"))
+                else:
+                    post(('text', "Formatted email addresses:\n"))
+                # Render in batches: one text update per batch instead of per line
+                for start in range(0, len(names), RENDER_BATCH):
+                    if cancel_event.is_set():
+                        break
+                    batch = names[start:start + RENDER_BATCH]
+                    post(('text', self.render_batch(format_choice, batch, domain)))
+                    post(('progress', start + len(batch)))
+            
+            if cancel_event.is_set():
+                post(('done', "Processing cancelled"))
+            else:
+                post(('done', "Processing completed successfully"))
         except Exception as e:
-            self.result_text.insert(tk.END, f"Processing error: {str(e)}")
-            self.status_var.set("Processing error")
+            post(('text', f"Processing error: {str(e)}"))
+            post(('done', "Processing error"))
+    
+    def render_validation(self, name, formats):
+        """Returns the result text of one name's verified formats (options 9 and 12)."""
+        lines = [f"\nFor {name}:\n"]
+        for style, result in formats.items():
+            if not result['checked']:
+                status = "– Skipped"
+            else:
+                status = "✓ Valid" if result['is_valid'] else "✗ Invalid"
+                if result['is_valid'] and result['ambiguous']:
+                    status = "⚠ Valid, but also generated for another name"
+            lines.append(f"{style}: {result['email']} [{status}]\n")
+        return ''.join(lines)
+    
+    def render_batch(self, format_choice, names, domain):
+        """Returns the result text for a batch of names (options 1-8, 10 and 11)."""
+        lines = []
+        if format_choice == '10':
+            all_formats = format_email_all_styles(names, domain)
+            for i, name in enumerate(names):
+                lines.append(f"\nFor {name}:\n")
+                for style, emails in all_formats.items():
+                    lines.append(f"{style}: {emails[i]}\n")
+        elif format_choice == '11':
+            all_formats = format_email_all_styles(names, domain)
+            validity = {style: validate_many(emails) for style, emails in all_formats.items()}
+            for i, name in enumerate(names):
+                lines.append(f"\nFor {name}:\n")
+                for style, emails in all_formats.items():
+                    email = emails[i]
+                    is_valid = validity[style][i]
+                    status = "✓ Valid" if is_valid else "✗ Invalid"
+                    lines.append(f"{style}: {email} - {status}\n")
+        else:
+            email_format = FORMAT_OPTIONS.get(format_choice, 'firstname.lastname')
+            formatted_emails = format_email_addresses(names, domain, email_format)
+            for name, email in zip(names, formatted_emails):
+                lines.append(f"{name}: {email}\n")
+        return ''.join(lines)
+    
+    def poll_results(self):
+        """Picks up everything the worker posted since the last poll, with a single text insert."""
+        texts = []
+        finished = None
+        try:
+            while finished is None:
+                kind, value = self.results_queue.get_nowait()
+                if kind == 'text':
+                    texts.append(value)
+                elif kind == 'progress':
+                    self.progress_var.set(value)
+                elif kind == 'done':
+                    finished = value
+        except queue.Empty:
+            pass
+        
+        if texts:
+            self.result_text.insert(tk.END, ''.join(texts))
+        if finished is not None:
+            self.status_var.set(finished)
+            self.generate_button.config(state=tk.NORMAL)
+            self.cancel_button.config(state=tk.DISABLED)
+        else:
+            self.root.after(POLL_INTERVAL_MS, self.poll_results)
+    
+    def cancel_processing(self):
+        self.cancel_event.set()
+        self.cancel_button.config(state=tk.DISABLED)
+        self.status_var.set("Cancelling...")
+    
+    def on_close(self):
+        # Stop any running job so the worker thread does not outlive the window
+        self.cancel_event.set()
+        self.executor.shutdown(wait=False)
+        self.root.destroy()
 
 if __name__ == "__main__":
     root = tk.Tk()
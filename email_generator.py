@@ -0,0 +1,140 @@
+import re
+import sys
+from collections import namedtuple
+from functools import lru_cache
+from itertools import starmap
+
+PARSE_CACHE_SIZE = 65536                                        # Distinct (name, normalizer) pairs kept parsed
+DOMAIN_CACHE_SIZE = 4096                                        # Distinct raw domains kept cleaned
+
+_INVALID_CHARS = re.compile(r'[^a-z0-9.-]')
+_HYPHEN_RUNS = re.compile(r'-+')
+
+# Each style is a template over the parsed name fields:
+# first, last, f (first initial) and l (last initial)
+STYLE_TEMPLATES = {
+    'firstname.lastname': '{first}.{last}',
+    'f.lastname': '{f}.{last}',
+    'firstname.l': '{first}.{l}',
+    'firstnamelastname': '{first}{last}',
+    'flastname': '{f}{last}',
+    'lastname.firstname': '{last}.{first}',
+    'l.firstname': '{l}.{first}',
+    'initials': '{f}{l}'
+}
+
+STYLES = tuple(STYLE_TEMPLATES)
+
+class ParsedName(namedtuple('ParsedName', 'first last f l hyphenated')):
+    """
+    Parsed, cleaned name. `hyphenated` is set when a field starts or ends
+    with a hyphen, so rendered local parts need hyphens collapsed and trimmed.
+    Records are shared between repeated names, so they must not be modified.
+    """
+    __slots__ = ()
+
+
+@lru_cache(maxsize=DOMAIN_CACHE_SIZE)
+def _compile_template(template, domain=None):
+    # '{first}.{last}' -> '{0}.{1}'.format, called with the record's fields
+    for index, field in enumerate(ParsedName._fields[:4]):
+        template = template.replace('{%s}' % field, '{%d}' % index)
+    if domain is not None:
+        # Cleaned domains only hold [a-z0-9.-], so they are safe to embed
+        template += '@' + domain
+    return template.format
+
+
+_RENDERERS = {style: _compile_template(template) for style, template in STYLE_TEMPLATES.items()}
+
+
+def _clean_part(part):
+    # Keep letters, digits, dots and hyphens only, without repeated hyphens
+    if not (part.isascii() and part.isalnum()):
+        part = _INVALID_CHARS.sub('', part)
+        if '--' in part:
+            part = _HYPHEN_RUNS.sub('-', part)
+    return part
+
+
+def split_name(name):
+    """
+    Splits a name into lower-case (firstname, lastname), before cleaning.
+    The last word is the lastname; all other words form a hyphenated firstname.
+    """
+    parts = name.strip().lower().split()
+    if len(parts) < 2:
+        # If single word, consider it as firstname
+        return (parts[0] if parts else ''), ''
+    return '-'.join(parts[:-1]), parts[-1]
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_name(name, normalize=None):
+    """
+    Parses a name once into a cleaned record.
+    Lead lists repeat the same names over and over: the most recent records
+    are memoized (the cache is bounded, so memory stays flat on any input)
+    and their fields interned, so each first name and surname is stored once.
+    """
+    if normalize is not None:
+        name = normalize(name)
+    firstname, lastname = split_name(name)
+    firstname = sys.intern(_clean_part(firstname))
+    lastname = sys.intern(_clean_part(lastname))
+    hyphenated = (firstname[:1] == '-' or firstname[-1:] == '-'
+                  or lastname[:1] == '-' or lastname[-1:] == '-')
+    return ParsedName(firstname, lastname, firstname[:1], lastname[:1], hyphenated)
+
+
+@lru_cache(maxsize=DOMAIN_CACHE_SIZE)
+def clean_domain(domain):
+    """
+    Cleans a domain the same way as local parts: lower-case, no special
+    characters, no repeated or leading/trailing hyphens.
+    Each distinct domain is cleaned once.
+    """
+    domain = _INVALID_CHARS.sub('', domain.strip().lower())
+    return _HYPHEN_RUNS.sub('-', domain).strip('-')
+
+
+def render_columns(records, domain, styles=STYLES):
+    """
+    Renders parsed names style by style: returns one list of emails per style.
+    `domain` must already be cleaned.
+    """
+    suffix = '@' + domain
+    # Only records with edge hyphens need the slow path
+    fixups = [i for i, record in enumerate(records) if record.hyphenated]
+    collapse = _HYPHEN_RUNS.sub
+
+    columns = []
+    for style in styles:
+        # Domain baked into the template, rendered over all records in C
+        column = list(starmap(_compile_template(STYLE_TEMPLATES[style], domain), records))
+        render = _RENDERERS[style]
+        for i in fixups:
+            column[i] = collapse('-', render(*records[i])).strip('-') + suffix
+        columns.append(column)
+    return columns
+
+
+def generate_emails(names, domain, styles=None, layout='style', normalize=None):
+    """
+    Generates email addresses for every name in a single pass.
+    Each name is parsed once and every requested style is rendered from it.
+    layout='style' returns {style: [email per name]} (style-major);
+    layout='name' returns a list of email tuples per name, in style order (name-major).
+    """
+    styles = STYLES if styles is None else tuple(styles)
+    for style in styles:
+        if style not in _RENDERERS:
+            raise ValueError(f"Unknown email style: {style}")
+    if layout not in ('style', 'name'):
+        raise ValueError(f"Unknown layout: {layout}")
+
+    records = [parse_name(name, normalize) for name in names]
+    columns = render_columns(records, clean_domain(domain), styles)
+    if layout == 'name':
+        return list(zip(*columns))
+    return dict(zip(styles, columns))
@@ -0,0 +1,308 @@
+import argparse
+import csv
+import hashlib
+import heapq
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from bisect import bisect_left
+from itertools import islice
+
+from verification_cache import normalize_address
+
+MAGIC = b'EFKNOWN1'
+# Magic, address count, Bloom filter size in bits, Bloom hash count, little-endian flag
+_HEADER = struct.Struct('<8sQQQ?')
+HEADER_SIZE = 64                                                # Header padded so the keys start 8-byte aligned
+BLOOM_BITS_PER_KEY = 10                                         # About 1% false positives with 7 hashes
+BLOOM_HASHES = 7
+RUN_SIZE = 1000000                                              # Addresses sorted in memory per run while building
+
+# Export status values meaning the address is deliverable or not
+DELIVERABLE_STATUSES = frozenset(('valid', 'deliverable', 'delivered', 'ok', 'true', '1', 'yes', 'confirmed'))
+UNDELIVERABLE_STATUSES = frozenset(('invalid', 'undeliverable', 'bounced', 'bounce', 'hard_bounce', 'false', '0',
+                                    'no', 'rejected'))
+
+
+def address_key(email):
+    """
+    Returns the 64-bit key an address is indexed under.
+    """
+    digest = hashlib.blake2b(normalize_address(email).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+def _bloom_positions(key, bits, hashes):
+    # Double hashing over the two halves of the key
+    h1, h2 = key & 0xFFFFFFFF, (key >> 32) | 1
+    return [(h1 + i * h2) % bits for i in range(hashes)]
+
+
+def parse_status(value):
+    """
+    Returns True, False or None (unrecognized) for an export's status value.
+    """
+    value = str(value).strip().lower()
+    if value in DELIVERABLE_STATUSES:
+        return True
+    if value in UNDELIVERABLE_STATUSES:
+        return False
+    return None
+
+
+def split_input(argument):
+    """
+    Splits an input argument 'path[:status]' into (path, status or None).
+    The suffix is only taken as a status when it is one, so paths holding
+    colons stay whole.
+    """
+    path, sep, status = argument.rpartition(':')
+    if sep and path and parse_status(status) is not None:
+        return path, status
+    return argument, None
+
+
+def read_export(path, email_col='email', status_col='status', status=None, counts=None):
+    """
+    Lazily yields (email, deliverable) pairs from a CSV or JSONL export, or a
+    text file of 'email[,status]' lines. `status` is used when a record has none.
+    Records without an address or with a missing or unrecognized status are
+    skipped. A `counts` dict gets the numbers of 'read' and 'skipped' records.
+    """
+    if counts is not None:
+        counts.setdefault('read', 0)
+        counts.setdefault('skipped', 0)
+    fmt = 'jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv' if path.endswith('.csv') else 'txt'
+    with open(path, encoding='utf-8', newline='') as source:
+        if fmt == 'csv':
+            records = csv.DictReader(source)
+        elif fmt == 'jsonl':
+            records = (json.loads(line) for line in source if line.strip())
+        else:
+            records = (dict(zip((email_col, status_col), line.strip().split(',', 1))) for line in source)
+        for record in records:
+            email = (record.get(email_col) or '').strip()
+            value = record.get(status_col)
+            deliverable = parse_status(value) if value not in (None, '') else parse_status(status or '')
+            if '@' in email and deliverable is not None:
+                if counts is not None:
+                    counts['read'] += 1
+                yield email, deliverable
+            elif counts is not None and any(record.values()):
+                counts['skipped'] += 1
+
+
+def _sorted_runs(pairs, run_size, directory):
+    # Sorts the pairs in runs of `run_size` keys, each written to a temporary
+    # file of (key, verdict) records; later pairs win within a run
+    runs = []
+    iterator = iter(pairs)
+    while True:
+        run = {}
+        for email, deliverable in islice(iterator, run_size):
+            run[address_key(email)] = deliverable
+        if not run:
+            return runs
+        run_file = tempfile.TemporaryFile(dir=directory)
+        record = struct.Struct('<Q?')
+        run_file.write(b''.join(record.pack(key, run[key]) for key in sorted(run)))
+        run_file.seek(0)
+        runs.append(run_file)
+
+
+def _read_run(run_file, order):
+    record = struct.Struct('<Q?')
+    while True:
+        data = run_file.read(record.size * 4096)
+        if not data:
+            return
+        for key, deliverable in record.iter_unpack(data):
+            yield key, order, deliverable
+
+
+def build_index(pairs, path, bloom_bits_per_key=BLOOM_BITS_PER_KEY, run_size=RUN_SIZE):
+    """
+    Builds a known-address index file from (email, deliverable) pairs.
+    Pairs are sorted in bounded runs merged from disk, so memory stays flat
+    whatever the export size. When an address appears several times the last
+    verdict wins. The index is written to a temporary file moved over `path`
+    when complete, so processes with the old index mapped keep reading it and
+    an interrupted build leaves the old index in place.
+    Returns the number of addresses indexed.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    temporary = path + '.tmp'
+    runs = _sorted_runs(pairs, run_size, directory)
+    count = 0
+    verdicts = bytearray()
+    try:
+        with open(temporary, 'wb') as index:
+            index.write(b'\0' * HEADER_SIZE)
+            merged = heapq.merge(*(_read_run(run_file, order) for order, run_file in enumerate(runs)))
+            keys = []
+            last_key = None
+            for key, _, deliverable in merged:
+                if key == last_key:
+                    # Same address in a later run: its verdict replaces the earlier one
+                    i = count - 1
+                    if deliverable:
+                        verdicts[i >> 3] |= 1 << (i & 7)
+                    else:
+                        verdicts[i >> 3] &= ~(1 << (i & 7))
+                    continue
+                if count % 8 == 0:
+                    verdicts.append(0)
+                if deliverable:
+                    verdicts[count >> 3] |= 1 << (count & 7)
+                keys.append(key)
+                count += 1
+                last_key = key
+                if len(keys) >= 65536:
+                    index.write(struct.pack(f'<{len(keys)}Q', *keys))
+                    keys = []
+            index.write(struct.pack(f'<{len(keys)}Q', *keys))
+            index.write(verdicts)
+
+            bloom_bits = count * bloom_bits_per_key
+            bloom = bytearray((bloom_bits + 7) // 8)
+            if bloom_bits:
+                index.flush()
+                with open(temporary, 'rb') as source:
+                    source.seek(HEADER_SIZE)
+                    for start in range(0, count, 65536):
+                        chunk = source.read(8 * min(65536, count - start))
+                        for (key,) in struct.iter_unpack('<Q', chunk):
+                            for position in _bloom_positions(key, bloom_bits, BLOOM_HASHES):
+                                bloom[position >> 3] |= 1 << (position & 7)
+            index.write(bloom)
+            index.seek(0)
+            index.write(_HEADER.pack(MAGIC, count, bloom_bits, BLOOM_HASHES, True))
+            index.flush()
+            os.fsync(index.fileno())
+        os.replace(temporary, path)
+    finally:
+        for run_file in runs:
+            run_file.close()
+        if os.path.exists(temporary):
+            os.remove(temporary)
+    return count
+
+
+class KnownAddressIndex:
+    """
+    Read-only index of addresses already known to be deliverable or not
+    (e.g. confirmed and bounced addresses from past campaigns), built with
+    build_index. The file is memory-mapped, so opening it is instant and
+    only the pages touched by lookups are read. A Bloom filter in front
+    answers most unknown addresses without searching the sorted keys.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count, self.bloom_bits, self.bloom_hashes, little_endian = _HEADER.unpack_from(self._mmap)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a known-address index")
+        if little_endian != (sys.byteorder == 'little'):
+            self.close()
+            raise ValueError(f"{path} was built on a machine with a different byte order")
+        view = memoryview(self._mmap)
+        keys_end = HEADER_SIZE + 8 * self.count
+        verdicts_end = keys_end + (self.count + 7) // 8
+        self._keys = view[HEADER_SIZE:keys_end].cast('Q')
+        self._verdicts = view[keys_end:verdicts_end]
+        self._bloom = view[verdicts_end:verdicts_end + (self.bloom_bits + 7) // 8]
+
+    def _get_key(self, key):
+        if self.bloom_bits:
+            bloom = self._bloom
+            for position in _bloom_positions(key, self.bloom_bits, self.bloom_hashes):
+                if not bloom[position >> 3] & (1 << (position & 7)):
+                    return None
+        i = bisect_left(self._keys, key)
+        if i == self.count or self._keys[i] != key:
+            return None
+        return bool(self._verdicts[i >> 3] & (1 << (i & 7)))
+
+    def get(self, email):
+        """
+        Returns True (known deliverable), False (known undeliverable) or None (unknown).
+        """
+        return self._get_key(address_key(email))
+
+    def get_many(self, emails):
+        """
+        Looks up several addresses and returns {email: verdict} for the known ones only.
+        """
+        known = {}
+        for email in dict.fromkeys(emails):
+            verdict = self._get_key(address_key(email))
+            if verdict is not None:
+                known[email] = verdict
+        return known
+
+    def __contains__(self, email):
+        return self.get(email) is not None
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        for view in ('_keys', '_verdicts', '_bloom'):
+            if hasattr(self, view):
+                getattr(self, view).release()
+        self._mmap.close()
+        self._file.close()
+
+
+def build_parser(prog='index'):
+    parser = argparse.ArgumentParser(
+        prog=prog,
+        description="Build a known-address index from exports of confirmed and bounced addresses."
+    )
+    parser.add_argument('--in', dest='inputs', nargs='+', required=True,
+                        help="Export files: .csv (with header), .jsonl, or text lines of 'email[,status]'. "
+                             "Append ':status' to a file for its records without one, e.g. bounces.txt:bounced. "
+                             "Later files win over earlier ones")
+    parser.add_argument('--out', required=True, help="Index file to write")
+    parser.add_argument('--email-col', default='email', help="Column holding the address (default: email)")
+    parser.add_argument('--status-col', default='status',
+                        help="Column holding the status, e.g. valid/deliverable or invalid/bounced (default: status)")
+    parser.add_argument('--status', help="Status of records without one in files without their own ':status'")
+    parser.add_argument('--bloom-bits', type=int, default=BLOOM_BITS_PER_KEY,
+                        help=f"Bloom filter bits per address, 0 for none (default: {BLOOM_BITS_PER_KEY})")
+    return parser
+
+
+def main(argv=None, prog='index'):
+    """
+    Runs the index command.
+    """
+    args = build_parser(prog).parse_args(argv)
+    if args.status is not None and parse_status(args.status) is None:
+        print(f"Error: unknown status {args.status!r}", file=sys.stderr)
+        return 2
+
+    inputs = [split_input(argument) for argument in args.inputs]
+    counts = [{} for _ in inputs]
+
+    def pairs():
+        for (path, status), file_counts in zip(inputs, counts):
+            yield from read_export(path, args.email_col, args.status_col, status or args.status, file_counts)
+
+    count = build_index(pairs(), args.out, bloom_bits_per_key=args.bloom_bits)
+    print(f"Indexed {count} addresses into {args.out} ({os.path.getsize(args.out)} bytes)", file=sys.stderr)
+    empty = False
+    for (path, _), file_counts in zip(inputs, counts):
+        if file_counts['skipped']:
+            print(f"Warning: {path}: skipped {file_counts['skipped']} records without an address or a known status",
+                  file=sys.stderr)
+        if not file_counts['read']:
+            print(f"Error: {path}: no records indexed; give its status with {path}:<status> or --status",
+                  file=sys.stderr)
+            empty = True
+    return 1 if empty else 0
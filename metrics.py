@@ -0,0 +1,200 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+# Histogram bucket upper bounds, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Prefix of every exported metric name
+NAMESPACE = 'email_finder'
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram, as used by Prometheus.
+    """
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # The last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                break
+        else:
+            i = len(self.buckets)
+        self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """
+        Returns the upper bound of the bucket holding the q-quantile (inf past the last bucket).
+        """
+        if not self.count:
+            return 0.0
+        seen = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            seen += count
+            if seen >= q * self.count:
+                return bound
+        return float('inf')
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'buckets': dict(zip([str(bound) for bound in self.buckets] + ['+Inf'], self.counts)),
+        }
+
+
+class Metrics:
+    """
+    Thread-safe counters and latency histograms for one run.
+    Metrics are identified by a name and optional labels, e.g.
+    inc('api_responses_total', status='429') or observe('stage_seconds', 0.2, stage='verify').
+    """
+    def __init__(self):
+        self.started = time.time()
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, stage):
+        """
+        Times a block as one call of `stage`.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe('stage_seconds', time.perf_counter() - start, stage=stage)
+
+    def counter(self, name, **labels):
+        """
+        Returns a counter's value; without labels, the sum over all its labels.
+        """
+        with self._lock:
+            if labels:
+                return self._counters.get((name, tuple(sorted(labels.items()))), 0)
+            return sum(value for (key, _), value in self._counters.items() if key == name)
+
+    def _labelled(self, name, label, items):
+        # {label value: item} for the series of `name` carrying `label`
+        return {dict(labels).get(label): item for (key, labels), item in items if key == name}
+
+    def summary(self):
+        """
+        Returns a human-readable report: time per stage, API latency and
+        errors, duplicate checks avoided, known-address hits and the cache hit rate.
+        """
+        with self._lock:
+            counters = list(self._counters.items())
+            histograms = list(self._histograms.items())
+        lines = [f"Run metrics ({time.time() - self.started:.1f}s):"]
+
+        stages = self._labelled('stage_seconds', 'stage', histograms)
+        if stages:
+            lines.append(f"  {'stage':<16}{'calls':>8}{'total s':>10}{'avg ms':>10}")
+            for stage, histogram in stages.items():
+                lines.append(f"  {stage:<16}{histogram.count:>8}{histogram.sum:>10.2f}"
+                             f"{1000 * histogram.sum / histogram.count:>10.1f}")
+
+        latency = dict(histograms).get(('api_request_seconds', ()))
+        if latency is not None:
+            lines.append(f"  API requests: {latency.count} (avg {1000 * latency.sum / latency.count:.0f} ms, "
+                         f"p50 <= {latency.quantile(0.5)}s, p95 <= {latency.quantile(0.95)}s)")
+        totals = {}
+        for (name, _), value in counters:
+            totals[name] = totals.get(name, 0) + value
+        if totals.get('api_rate_limited_total') or totals.get('api_retries_total'):
+            lines.append(f"  429 responses: {totals.get('api_rate_limited_total', 0)}, "
+                         f"retries: {totals.get('api_retries_total', 0)}")
+        errors = self._labelled('api_errors_total', 'error', counters)
+        if errors:
+            lines.append("  API errors: " + ', '.join(f"{error} x{count}" for error, count in errors.items()))
+
+        if totals.get('deduplicated_checks_total'):
+            lines.append(f"  Duplicate checks avoided: {totals['deduplicated_checks_total']}")
+        if totals.get('known_hits_total'):
+            lines.append(f"  Known addresses: {totals['known_hits_total']} resolved from the index")
+        lookups = totals.get('cache_hits_total', 0) + totals.get('cache_misses_total', 0)
+        if lookups:
+            lines.append(f"  Cache: {totals.get('cache_hits_total', 0)} hits / {lookups} lookups "
+                         f"({100 * totals.get('cache_hits_total', 0) / lookups:.0f}% hit rate)")
+        return '\n'.join(lines)
+
+    def to_dict(self):
+        """
+        Returns every metric as JSON-friendly data.
+        """
+        with self._lock:
+            counters = list(self._counters.items())
+            histograms = list(self._histograms.items())
+        return {
+            'started': self.started,
+            'counters': [{'name': name, 'labels': dict(labels), 'value': value}
+                         for (name, labels), value in counters],
+            'histograms': [dict(histogram.to_dict(), name=name, labels=dict(labels))
+                           for (name, labels), histogram in histograms],
+        }
+
+    def to_prometheus(self):
+        """
+        Returns every metric in the Prometheus text exposition format.
+        """
+        def series(name, labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return f"{NAMESPACE}_{name}"
+            return f"{NAMESPACE}_{name}{{" + ','.join(f'{key}="{value}"' for key, value in pairs) + "}"
+
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items(), key=lambda item: item[0])
+        lines = []
+        typed = set()
+        for (name, labels), value in counters:
+            if name not in typed:
+                lines.append(f"# TYPE {NAMESPACE}_{name} counter")
+                typed.add(name)
+            lines.append(f"{series(name, labels)} {value}")
+        for (name, labels), histogram in histograms:
+            if name not in typed:
+                lines.append(f"# TYPE {NAMESPACE}_{name} histogram")
+                typed.add(name)
+            cumulative = 0
+            for bound, count in zip([str(bound) for bound in histogram.buckets] + ['+Inf'], histogram.counts):
+                cumulative += count
+                lines.append(f"{series(name + '_bucket', labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{series(name + '_sum', labels)} {histogram.sum}")
+            lines.append(f"{series(name + '_count', labels)} {histogram.count}")
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path):
+        """
+        Writes the metrics to a file: JSON when the path ends in .json,
+        Prometheus text format otherwise (e.g. for node_exporter's textfile collector).
+        """
+        with open(path, 'w', encoding='utf-8') as f:
+            if path.endswith('.json'):
+                json.dump(self.to_dict(), f, indent=2)
+            else:
+                f.write(self.to_prometheus())
@@ -1,33 +1,100 @@
+import unicodedata
+from functools import lru_cache
+
+# Letters NFKD does not decompose into ASCII, with their usual transliteration
+SPECIAL_LETTERS = {
+    'ß': 'ss', 'ẞ': 'SS',
+    'æ': 'ae', 'Æ': 'AE',
+    'œ': 'oe', 'Œ': 'OE',
+    'ø': 'o', 'Ø': 'O',
+    'ł': 'l', 'Ł': 'L',
+    'đ': 'd', 'Đ': 'D',
+    'ð': 'd', 'Ð': 'D',
+    'þ': 'th', 'Þ': 'TH',
+    'ħ': 'h', 'Ħ': 'H',
+    'ı': 'i', 'İ': 'I',
+    'ŀ': 'l', 'Ŀ': 'L',
+    'ŋ': 'n', 'Ŋ': 'N',
+    'ŧ': 't', 'Ŧ': 'T',
+    'ĸ': 'k', 'ſ': 's',
+    'ƀ': 'b', 'Ɓ': 'B',
+    'ƈ': 'c', 'Ƈ': 'C',
+    'ƒ': 'f', 'Ƒ': 'F',
+    'ƙ': 'k', 'Ƙ': 'K',
+    'ƚ': 'l', 'ƞ': 'n',
+    'ƥ': 'p', 'Ƥ': 'P',
+    'ƭ': 't', 'Ƭ': 'T',
+    'ƴ': 'y', 'Ƴ': 'Y',
+    'ƶ': 'z', 'Ƶ': 'Z',
+    'ȥ': 'z', 'Ȥ': 'Z',
+    'ɇ': 'e', 'Ɇ': 'E',
+    'ɉ': 'j', 'Ɉ': 'J',
+    'ɍ': 'r', 'Ɍ': 'R',
+    'ɏ': 'y', 'Ɏ': 'Y',
+    'ǆ': 'dz', 'ǅ': 'Dz', 'Ǆ': 'DZ',
+    'ǉ': 'lj', 'ǈ': 'Lj', 'Ǉ': 'LJ',
+    'ǌ': 'nj', 'ǋ': 'Nj', 'Ǌ': 'NJ',
+    'ĳ': 'ij', 'Ĳ': 'IJ',
+    'ﬀ': 'ff', 'ﬁ': 'fi', 'ﬂ': 'fl', 'ﬃ': 'ffi', 'ﬄ': 'ffl', 'ﬅ': 'st', 'ﬆ': 'st',
+    # Apostrophes and dashes commonly found in names
+    '’': "'", '‘': "'", 'ʼ': "'", '´': "'",
+    '‐': '-', '‑': '-', '‒': '-', '–': '-', '—': '-',
+}
+
+# Latin-1, Latin Extended-A/B, IPA letters and Latin Extended Additional,
+# plus general punctuation and alphabetic presentation forms (ligatures)
+_TABLE_RANGES = ((0x80, 0x2B0), (0x1E00, 0x1F00), (0x2000, 0x2070), (0xFB00, 0xFB07))
+
+
+def _decompose(char):
+    # NFKD splits accented letters into base letter + combining marks; keep the base
+    decomposed = unicodedata.normalize('NFKD', char)
+    return ''.join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def _build_table():
+    table = {}
+    for start, end in _TABLE_RANGES:
+        for codepoint in range(start, end):
+            char = chr(codepoint)
+            if char in SPECIAL_LETTERS:
+                continue
+            stripped = _decompose(char)
+            if stripped != char and stripped.isascii():
+                table[codepoint] = stripped
+    table.update({ord(char): replacement for char, replacement in SPECIAL_LETTERS.items()})
+    return table
+
+
+# Built once at import and applied with str.translate
+TRANSLATION_TABLE = _build_table()
+
+
+@lru_cache(maxsize=65536)
+def _normalize_token(token):
+    normalized = token.translate(TRANSLATION_TABLE)
+    if not normalized.isascii():
+        # Characters outside the table: decompose them on the fly
+        normalized = ''.join(
+            char if char.isascii() else SPECIAL_LETTERS.get(char) or _decompose(char)
+            for char in normalized
+        )
+    return normalized
+
+
+@lru_cache(maxsize=131072)
+def _normalize_name(text):
+    return ' '.join([_normalize_token(token) for token in text.split(' ')])
+
+
 def normalize_accented_chars(text):
     """
-    Replace accented characters with their non-accented equivalents.
-    Specifically handles é, è, ç, à, ô, î and converts them to e, e, c, a, o, i.
+    Replace accented and special letters with their ASCII equivalents.
+    Covers accents (é -> e), ligatures (æ -> ae, ß -> ss) and letters
+    such as ł, ø or đ. Characters with no ASCII form are left unchanged.
     """
-    if not text:
+    if not text or text.isascii():
         return text
-        
-    # Define character mappings
-    char_map = {
-        'é': 'e',
-        'è': 'e',
-        'ê': 'e',
-        'ë': 'e',
-        'ç': 'c',
-        'à': 'a',
-        'â': 'a',
-        'ä': 'a',
-        'ô': 'o',
-        'ö': 'o',
-        'î': 'i',
-        'ï': 'i',
-        'ù': 'u',
-        'û': 'u',
-        'ü': 'u'
-    }
-    
-    # Replace each accented character
-    normalized_text = ''
-    for char in text:
-        normalized_text += char_map.get(char, char)
-    
-    return normalized_text
\ No newline at end of file
+
+    # Names repeat a lot: whole names and single words are both memoized
+    return _normalize_name(text)
@@ -0,0 +1,182 @@
+import re
+from collections import namedtuple
+
+from email_generator import _HYPHEN_RUNS, STYLE_TEMPLATES, clean_domain, parse_name
+
+SEPARATORS = '._-'
+MAX_PARTS = 6                                                   # Fields, separators and suffix in one local part
+
+# Template fields: {first} and {last}, truncated with {first:.3}, initials
+# {f} and {l} (same as {first:.1} and {last:.1}), and {#} for a trailing
+# number that varies between people (left out when generating)
+_FIELD = re.compile(r'\{(first|last|f|l|#)(?::\.(\d+))?\}')
+
+# Inferred template of a domain, the predefined style it corresponds to (or
+# None), and how many of the domain's known addresses it reproduces
+InferredPattern = namedtuple('InferredPattern', 'template style matched total')
+
+_STYLE_NAMES = {template: style for style, template in STYLE_TEMPLATES.items()}
+
+
+def _field(name, length):
+    # Template text for a (possibly truncated) field
+    if length == 1:
+        return '{%s}' % name[0]
+    if length:
+        return '{%s:.%d}' % (name, length)
+    return '{%s}' % name
+
+
+def explain(record, local):
+    """
+    Returns every template that turns the parsed name `record` into the
+    local part `local`. A trailing number yields both a literal and a {#}
+    template.
+    """
+    templates = set()
+    values = (('first', record.first), ('last', record.last))
+
+    def walk(pos, parts, used):
+        if pos == len(local):
+            if used:
+                templates.add(''.join(parts))
+            return
+        if len(parts) >= MAX_PARTS:
+            return
+        rest = local[pos:]
+        for name, value in values:
+            if name in used or not value:
+                continue
+            if rest.startswith(value):
+                walk(pos + len(value), parts + [_field(name, 0)], used | {name})
+            for length in range(min(len(value) - 1, len(rest)), 0, -1):
+                if rest.startswith(value[:length]):
+                    walk(pos + length, parts + [_field(name, length)], used | {name})
+        if rest[0] in SEPARATORS and parts and parts[-1].startswith('{'):
+            # A separator only follows a field
+            walk(pos + 1, parts + [rest[0]], used)
+        if used and rest.isdigit():
+            templates.add(''.join(parts) + rest)
+            templates.add(''.join(parts) + '{#}')
+
+    walk(0, [], frozenset())
+    return templates
+
+
+def compile_template(template):
+    """
+    Returns a function rendering a parsed name's local part with the template.
+    """
+    # '{first:.3}.{l}' -> '{0:.3}.{1:.1}'.format
+    def field(match):
+        name, length = match.groups()
+        if name == '#':
+            return ''
+        index = 0 if name in ('first', 'f') else 1
+        if name in ('f', 'l'):
+            length = '1'
+        return '{%d:.%s}' % (index, length) if length else '{%d}' % index
+
+    render = _FIELD.sub(field, template).format
+
+    def render_local(record):
+        local = render(record.first, record.last)
+        if record.hyphenated:
+            local = _HYPHEN_RUNS.sub('-', local).strip('-')
+        return local
+    return render_local
+
+
+def _matches(template, render, record, local):
+    if template.endswith('{#}'):
+        stem = render(record)
+        return local.startswith(stem) and (local == stem or local[len(stem):].isdigit())
+    return render(record) == local
+
+
+def _rank(template, matched):
+    # Most samples reproduced first; then predefined styles, fixed templates
+    # over {#}, and fewer truncated fields
+    return (matched, template in _STYLE_NAMES, not template.endswith('{#}'), -template.count(':.'))
+
+
+def infer_pattern(samples):
+    """
+    Infers the template of one domain from its known (record, local part)
+    pairs. Returns an InferredPattern, or None if no template explains any sample.
+    """
+    candidates = set()
+    for record, local in samples:
+        candidates |= explain(record, local)
+    best = None
+    for template in candidates:
+        render = compile_template(template)
+        matched = sum(1 for record, local in samples if _matches(template, render, record, local))
+        if best is None or _rank(template, matched) > _rank(best[0], best[1]):
+            best = (template, matched)
+    if best is None:
+        return None
+    template, matched = best
+    return InferredPattern(template, _STYLE_NAMES.get(template), matched, len(samples))
+
+
+class PatternIndex:
+    """
+    Per-domain index of address templates inferred from known name/email
+    pairs, covering formats beyond the predefined styles: any separator,
+    truncated names and numeric suffixes. Addresses for other people on a
+    known domain are then generated without any verification call.
+    """
+    def __init__(self, normalize=None, min_confidence=0.5):
+        self.normalize = normalize
+        self.min_confidence = min_confidence
+        self.patterns = {}
+        self._renderers = {}
+
+    def learn(self, pairs):
+        """
+        Infers the template of every domain in an iterable of (name, email)
+        pairs, in one pass. Returns the number of domains whose template was
+        learned (domains below `min_confidence` are not counted).
+        """
+        samples = {}
+        for name, email in pairs:
+            local, _, domain = email.strip().lower().rpartition('@')
+            if not local or not domain:
+                continue
+            record = parse_name(name, self.normalize)
+            samples.setdefault(clean_domain(domain), []).append((record, local))
+        learned = 0
+        for domain, domain_samples in samples.items():
+            pattern = infer_pattern(domain_samples)
+            if pattern is not None and pattern.matched / pattern.total >= self.min_confidence:
+                self.patterns[domain] = pattern
+                learned += 1
+        return learned
+
+    def pattern(self, domain):
+        """
+        Returns the InferredPattern of a domain, or None if it is not known.
+        """
+        return self.patterns.get(clean_domain(domain))
+
+    def generate(self, name, domain):
+        """
+        Returns the address of `name` on `domain` following the domain's
+        template, or None if the domain is not known.
+        """
+        domain = clean_domain(domain)
+        pattern = self.patterns.get(domain)
+        if pattern is None:
+            return None
+        render = self._renderers.get(pattern.template)
+        if render is None:
+            render = self._renderers[pattern.template] = compile_template(pattern.template)
+        local = render(parse_name(name, self.normalize))
+        return f"{local}@{domain}" if local else None
+
+    def __len__(self):
+        return len(self.patterns)
+
+    def __contains__(self, domain):
+        return clean_domain(domain) in self.patterns
@@ -0,0 +1,49 @@
+import threading
+
+
+class PatternLearner:
+    """
+    Learns which email style each domain uses from confirmed deliverable hits.
+    Styles with more hits on a domain are tried first. Once a domain has at
+    least `min_hits` hits and one style holds at least `confidence` of them,
+    only that style is tried for the remaining names.
+    """
+    def __init__(self, min_hits=3, confidence=0.9):
+        self.min_hits = min_hits
+        self.confidence = confidence
+        self.hits = {}
+        self._lock = threading.Lock()
+
+    def record(self, domain, style):
+        """
+        Records a confirmed deliverable address of the given style.
+        """
+        with self._lock:
+            counts = self.hits.setdefault(domain, {})
+            counts[style] = counts.get(style, 0) + 1
+
+    def confident_style(self, domain):
+        """
+        Returns the style the domain is known to use, or None if not yet confident.
+        """
+        with self._lock:
+            counts = self.hits.get(domain)
+            if not counts:
+                return None
+            total = sum(counts.values())
+            style, count = max(counts.items(), key=lambda item: item[1])
+        if total >= self.min_hits and count / total >= self.confidence:
+            return style
+        return None
+
+    def candidates(self, domain, styles):
+        """
+        Returns the styles to try for a name on this domain, best first.
+        """
+        confident = self.confident_style(domain)
+        if confident in styles:
+            return [confident]
+        with self._lock:
+            counts = dict(self.hits.get(domain, {}))
+        # sorted() is stable, so unseen styles keep their original order
+        return sorted(styles, key=lambda style: -counts.get(style, 0))
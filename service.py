@@ -0,0 +1,218 @@
+import argparse
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from batch_pipeline import process_rows
+from email_core import domain_preflight, make_verification_engine
+from email_generator import STYLES
+from metrics import Metrics
+from pattern_learner import PatternLearner
+
+SERVICE_HOST = '127.0.0.1'                                      # Listen on this machine only
+SERVICE_PORT = 8025
+MAX_REQUEST_BYTES = 1024 * 1024                                 # Larger request bodies are refused
+MAX_NAMES = 1000                                                # Names per request; use batch mode for more
+
+OPERATIONS = ('generate', 'validate', 'identify')
+
+
+class BadRequest(Exception):
+    """
+    Raised for a request the service cannot process; answered with 400.
+    """
+
+
+class EmailService:
+    """
+    Long-lived state shared by every request: the verification engine (pooled
+    API connections and the verdict cache), the pattern learner with each
+    domain's confirmed formats, the DNS pre-flight cache and the run metrics.
+    The parse and normalization caches stay warm with the process.
+    Thread-safe: requests from many clients run at the same time.
+    """
+    def __init__(self, preflight=True):
+        self.metrics = Metrics()
+        self.learner = PatternLearner()
+        self.preflight = domain_preflight() if preflight else None
+        self.started = time.time()
+        self._engine = None
+        self._close = None
+        self._lock = threading.Lock()
+
+    def engine(self):
+        # Built on first use, so generate/validate work without an API key
+        with self._lock:
+            if self._engine is None:
+                self._engine, self._close = make_verification_engine(self.metrics)
+            return self._engine
+
+    def handle(self, operation, payload):
+        """
+        Runs an operation on a JSON request and returns the JSON response.
+        The request gives `name` or `names`, a `domain` and optionally `styles`;
+        identify also takes `learn_patterns`. Results have the same fields as
+        batch mode results.
+        """
+        if not isinstance(payload, dict):
+            raise BadRequest("Expected a JSON object")
+        names = payload.get('names')
+        if names is None:
+            names = [payload['name']] if payload.get('name') else []
+        domain = payload.get('domain')
+        if not isinstance(names, list) or not all(isinstance(name, str) and name.strip() for name in names):
+            raise BadRequest("'names' must be a list of non-empty strings")
+        if not names:
+            raise BadRequest("Give 'name' or 'names'")
+        if len(names) > MAX_NAMES:
+            raise BadRequest(f"At most {MAX_NAMES} names per request")
+        if not isinstance(domain, str) or not domain.strip():
+            raise BadRequest("Give 'domain'")
+        styles = payload.get('styles') or STYLES
+        if not isinstance(styles, (list, tuple)) or not all(isinstance(style, str) for style in styles):
+            raise BadRequest("'styles' must be a list of style names")
+        unknown = [style for style in styles if style not in STYLES]
+        if unknown:
+            raise BadRequest(f"Unknown styles: {', '.join(map(str, unknown))}")
+
+        rows = [(name.strip(), domain.strip()) for name in names]
+        engine = learner = preflight = None
+        if operation == 'identify':
+            engine = self.engine()
+            preflight = self.preflight
+            if payload.get('learn_patterns'):
+                learner = self.learner
+        self.metrics.inc('service_requests_total', operation=operation)
+        # One chunk per request: nothing to remember across chunks
+        results = process_rows(rows, operation, styles, engine=engine, learner=learner, chunk_size=len(rows),
+                               preflight=preflight, metrics=self.metrics, assigned_memory=0)
+        return {'results': list(results)}
+
+    def health(self):
+        return {'status': 'ok', 'uptime': round(time.time() - self.started, 1)}
+
+    def close(self):
+        with self._lock:
+            if self._close is not None:
+                self._close()
+                self._engine = self._close = None
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    """
+    POST /generate, /validate or /identify with a JSON body;
+    GET /health, or /metrics for the Prometheus text format.
+    """
+    protocol_version = 'HTTP/1.1'                              # Keep-alive between requests of a client
+    disable_nagle_algorithm = True                              # Small answers go out at once, not after a delayed ACK
+    quiet = False
+
+    def _send(self, status, body, content_type='application/json'):
+        if content_type == 'application/json':
+            body = json.dumps(body, ensure_ascii=False)
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', f'{content_type}; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        service = self.server.service
+        if self.path == '/health':
+            self._send(200, service.health())
+        elif self.path == '/metrics':
+            self._send(200, service.metrics.to_prometheus(), 'text/plain; version=0.0.4')
+        else:
+            self._send(404, {'error': f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        operation = self.path.strip('/')
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            # The body cannot be told apart from the next request
+            self.close_connection = True
+            self._send(400, {'error': "Invalid Content-Length"})
+            return
+        if length > MAX_REQUEST_BYTES:
+            self.close_connection = True
+            self._send(413, {'error': f"Request body over {MAX_REQUEST_BYTES} bytes"})
+            return
+        body = self.rfile.read(length)
+        if operation not in OPERATIONS:
+            self._send(404, {'error': f"Unknown operation {operation!r}; use one of {', '.join(OPERATIONS)}"})
+            return
+        start = time.perf_counter()
+        try:
+            try:
+                payload = json.loads(body or b'null')
+            except (json.JSONDecodeError, UnicodeDecodeError) as e:
+                raise BadRequest(f"Invalid JSON: {e}")
+            response = self.server.service.handle(operation, payload)
+        except BadRequest as e:
+            self._send(400, {'error': str(e)})
+        except Exception as e:
+            self._send(500, {'error': f"{type(e).__name__}: {e}"})
+        else:
+            self._send(200, response)
+        self.server.service.metrics.observe('service_request_seconds', time.perf_counter() - start,
+                                            operation=operation)
+
+    def log_message(self, format, *args):
+        if not self.quiet:
+            super().log_message(format, *args)
+
+
+class ServiceServer(ThreadingHTTPServer):
+    """
+    HTTP server handling each connection on its own thread.
+    """
+    daemon_threads = True
+    request_queue_size = 128                                    # Connections waiting to be accepted
+
+    def __init__(self, address, service):
+        super().__init__(address, ServiceHandler)
+        self.service = service
+
+
+def make_server(host=SERVICE_HOST, port=SERVICE_PORT, service=None):
+    """
+    Builds the HTTP server around an EmailService.
+    """
+    return ServiceServer((host, port), service if service is not None else EmailService())
+
+
+def build_parser(prog='serve'):
+    parser = argparse.ArgumentParser(
+        prog=prog,
+        description="Serve generate, validate and identify over a local HTTP/JSON endpoint, keeping caches warm."
+    )
+    parser.add_argument('--host', default=SERVICE_HOST, help=f"Address to listen on (default: {SERVICE_HOST})")
+    parser.add_argument('--port', type=int, default=SERVICE_PORT, help=f"Port to listen on (default: {SERVICE_PORT})")
+    parser.add_argument('--no-preflight', dest='preflight', action='store_false',
+                        help="Don't resolve domains before verifying in identify requests")
+    parser.add_argument('--quiet', action='store_true', help="Don't log every request")
+    return parser
+
+
+def main(argv=None, prog='serve'):
+    """
+    Runs the service until interrupted.
+    """
+    args = build_parser(prog).parse_args(argv)
+    ServiceHandler.quiet = args.quiet
+    server = make_server(args.host, args.port, EmailService(preflight=args.preflight))
+    print(f"Serving on http://{args.host}:{server.server_address[1]} (Ctrl+C to stop)", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.service.close()
+    return 0
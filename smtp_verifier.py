@@ -0,0 +1,285 @@
+import secrets
+import smtplib
+import threading
+import time
+
+from verifier_clients import VerifierClient
+
+# RCPT TO reply codes meaning the mailbox exists
+ACCEPTED_CODES = (250, 251)
+
+
+def resolve_mx(domain):
+    """
+    Returns the domain's mail hosts, best preference first.
+    An empty list means the domain does not accept mail (no such domain or null MX).
+    Uses dnspython when installed, otherwise falls back to the domain itself.
+    """
+    try:
+        import dns.resolver
+    except ImportError:
+        return [domain]
+
+    try:
+        answers = dns.resolver.resolve(domain, 'MX')
+    except dns.resolver.NXDOMAIN:
+        return []
+    except Exception:
+        # No MX record (or DNS failure): mail goes to the domain itself
+        return [domain]
+    hosts = [str(answer.exchange).rstrip('.') for answer in sorted(answers, key=lambda answer: answer.preference)]
+    # A null MX ('.') explicitly refuses mail
+    return [host for host in hosts if host]
+
+
+class SmtpSession:
+    """
+    One open SMTP connection holding a mail transaction open, so RCPT TO
+    probes can be sent one after the other without reconnecting. The
+    transaction is reset every `max_rcpt` recipients. When the server
+    supports PIPELINING, probes are sent in a single write.
+    """
+    def __init__(self, host, port=25, helo_host=None, mail_from='', timeout=10, max_rcpt=50):
+        self.host = host
+        self.mail_from = mail_from
+        self.max_rcpt = max_rcpt
+        self.smtp = smtplib.SMTP(host, port, local_hostname=helo_host, timeout=timeout)
+        self.smtp.ehlo_or_helo_if_needed()
+        self.pipelining = self.smtp.has_extn('pipelining')
+        self._rcpts = 0
+        self._in_transaction = False
+
+    def _begin(self):
+        if self._in_transaction and self._rcpts < self.max_rcpt:
+            return
+        if self._in_transaction:
+            self.smtp.rset()
+        code, message = self.smtp.mail(self.mail_from)
+        if code != 250:
+            raise smtplib.SMTPSenderRefused(code, message, self.mail_from)
+        self._in_transaction = True
+        self._rcpts = 0
+
+    def probe(self, emails):
+        """
+        Sends RCPT TO for each address and returns the reply codes, in order.
+        """
+        codes = []
+        pending = list(emails)
+        while pending:
+            self._begin()
+            room = self.max_rcpt - self._rcpts
+            batch, pending = pending[:room], pending[room:]
+            if self.pipelining and len(batch) > 1:
+                self.smtp.send(''.join(f"RCPT TO:<{email}>\r\n" for email in batch))
+                codes.extend(self.smtp.getreply()[0] for _ in batch)
+            else:
+                codes.extend(self.smtp.rcpt(email)[0] for email in batch)
+            self._rcpts += len(batch)
+        return codes
+
+    def close(self):
+        try:
+            self.smtp.quit()
+        except Exception:
+            self.smtp.close()
+
+
+class _SessionPool:
+    """
+    At most `size` sessions per mail host; idle sessions are reused.
+    """
+    def __init__(self, connect, size):
+        self._connect = connect
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def acquire(self, fresh=False):
+        """
+        Returns (session, reused): an idle session unless `fresh`, else a new one.
+        """
+        self._slots.acquire()
+        if not fresh:
+            with self._lock:
+                if self._idle:
+                    return self._idle.pop(), True
+        try:
+            return self._connect(), False
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, session, broken=False):
+        if broken:
+            session.close()
+        else:
+            with self._lock:
+                self._idle.append(session)
+        self._slots.release()
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for session in idle:
+            session.close()
+
+
+class SmtpVerifier(VerifierClient):
+    """
+    Deliverability backend probing the recipient's mail server with RCPT TO,
+    without sending any message. MX hosts are resolved once per domain and a
+    small pool of open sessions is kept per host. Each domain is probed once
+    with a random address to detect catch-all servers, whose answers say
+    nothing about a given mailbox (their addresses get a None verdict).
+    Offers the same check(email) interface as AbstractApiClient, including
+    the optional `metrics` (probe latency and connection errors).
+    """
+    def __init__(self, helo_host=None, mail_from='', port=25, pool_size=2, timeout=10, max_rcpt=50,
+                 resolve=resolve_mx, metrics=None):
+        self.helo_host = helo_host
+        self.mail_from = mail_from
+        self.port = port
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.max_rcpt = max_rcpt
+        # Lets the engine group checks, which are then probed domain by domain over one session
+        self.batch_size = max_rcpt
+        self.resolve = resolve
+        self.metrics = metrics
+        self._mx = {}
+        self._catch_all = {}
+        self._pools = {}
+        self._domain_locks = {}
+        self._lock = threading.Lock()
+
+    def mx_hosts(self, domain):
+        """
+        Returns the domain's mail hosts, resolving them only once per domain.
+        """
+        with self._lock:
+            if domain in self._mx:
+                return self._mx[domain]
+        hosts = self.resolve(domain)
+        with self._lock:
+            self._mx[domain] = hosts
+        return hosts
+
+    def _pool(self, host):
+        with self._lock:
+            pool = self._pools.get(host)
+            if pool is None:
+                pool = _SessionPool(
+                    lambda: SmtpSession(host, self.port, self.helo_host, self.mail_from,
+                                        self.timeout, self.max_rcpt),
+                    self.pool_size
+                )
+                self._pools[host] = pool
+        return pool
+
+    def _probe_domain(self, domain, emails):
+        # The first probe of a domain also runs the catch-all test; other
+        # threads wait for it so the test is sent only once per domain
+        with self._lock:
+            known = domain in self._catch_all
+            domain_lock = self._domain_locks.setdefault(domain, threading.Lock())
+        if known:
+            return self._send_probes(domain, emails, False)
+        with domain_lock:
+            with self._lock:
+                probe_catch_all = domain not in self._catch_all
+            return self._send_probes(domain, emails, probe_catch_all)
+
+    def _send_probes(self, domain, emails, probe_catch_all):
+        # Returns the RCPT codes for emails, using the first reachable MX host
+        probes = ([f"{secrets.token_hex(8)}@{domain}"] if probe_catch_all else []) + emails
+
+        for host in self.mx_hosts(domain):
+            codes = self._probe_host(host, probes)
+            if codes is None:
+                continue
+            if probe_catch_all:
+                with self._lock:
+                    self._catch_all[domain] = codes[0] in ACCEPTED_CODES
+                codes = codes[1:]
+            return codes
+        return None
+
+    def _probe_host(self, host, probes):
+        # Returns the RCPT codes from one host, or None when it cannot be reached.
+        # A pooled session the server dropped while idle is retried once on a new connection
+        pool = self._pool(host)
+        fresh = False
+        while True:
+            try:
+                session, reused = pool.acquire(fresh)
+            except (OSError, smtplib.SMTPException) as e:
+                self._count_error(e)
+                return None
+            start = time.perf_counter()
+            try:
+                codes = session.probe(probes)
+            except (OSError, smtplib.SMTPException) as e:
+                self._count_error(e)
+                pool.release(session, broken=True)
+                if not reused:
+                    return None
+                fresh = True
+                continue
+            pool.release(session)
+            if self.metrics is not None:
+                self.metrics.observe('smtp_probe_seconds', time.perf_counter() - start)
+            return codes
+
+    def _count_error(self, error):
+        if self.metrics is not None:
+            self.metrics.inc('smtp_errors_total', error=type(error).__name__)
+
+    def is_catch_all(self, domain):
+        """
+        Returns True/False once the domain has been probed, None before.
+        """
+        with self._lock:
+            return self._catch_all.get(domain)
+
+    def check_many(self, emails):
+        """
+        Checks many addresses, sending each domain's probes over one session.
+        Returns a dict mapping each address to True, False or None.
+        """
+        by_domain = {}
+        for email in dict.fromkeys(emails):
+            by_domain.setdefault(email.rsplit('@', 1)[-1].lower(), []).append(email)
+
+        verdicts = {}
+        for domain, domain_emails in by_domain.items():
+            if not self.mx_hosts(domain):
+                # Domain does not accept mail at all
+                verdicts.update((email, False) for email in domain_emails)
+                continue
+            codes = self._probe_domain(domain, domain_emails)
+            if codes is None or self.is_catch_all(domain):
+                verdicts.update((email, None) for email in domain_emails)
+                continue
+            for email, code in zip(domain_emails, codes):
+                if code in ACCEPTED_CODES:
+                    verdicts[email] = True
+                elif 500 <= code < 600:
+                    verdicts[email] = False
+                else:
+                    # Greylisting or temporary failure: unknown
+                    verdicts[email] = None
+        return verdicts
+
+    def check(self, email):
+        """
+        Checks one address.
+        Returns True if the mailbox exists, False if not, None if unknown.
+        """
+        return self.check_many([email])[email]
+
+    def close(self):
+        with self._lock:
+            pools, self._pools = list(self._pools.values()), {}
+        for pool in pools:
+            pool.close()
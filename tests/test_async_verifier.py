@@ -0,0 +1,109 @@
+import importlib.util
+import json
+import os
+import sys
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from async_verifier import AsyncVerificationEngine
+from verifier_clients import AbstractApiClient
+
+HAVE_REQUESTS = importlib.util.find_spec('requests') is not None
+
+
+class StubApi(ThreadingHTTPServer):
+    """
+    Local stand-in for the Abstract API: answers from `answers` (address ->
+    deliverability), after `latency` seconds, recording requests in flight.
+    Addresses in `throttled` get one 429 before their answer.
+    """
+    daemon_threads = True
+
+    def __init__(self, answers, latency=0.0, throttled=()):
+        super().__init__(('127.0.0.1', 0), StubApiHandler)
+        self.answers = answers
+        self.latency = latency
+        self.throttled = set(throttled)
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.started = []
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}/v1/'
+
+
+class StubApiHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        email = parse_qs(urlparse(self.path).query)['email'][0]
+        with server.lock:
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+            server.started.append(time.monotonic())
+            throttle = email in server.throttled
+            server.throttled.discard(email)
+        time.sleep(server.latency)
+        if throttle:
+            status, body = 429, {'error': 'rate limited'}
+        else:
+            status, body = 200, {'email': email, 'deliverability': server.answers.get(email, 'UNKNOWN'),
+                                 'is_valid_format': {'value': True}}
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        if throttle:
+            self.send_header('Retry-After', '0')
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+        with server.lock:
+            server.in_flight -= 1
+
+    def log_message(self, format, *args):
+        pass
+
+
+@unittest.skipUnless(HAVE_REQUESTS, "requests is not installed")
+class EngineAgainstStubTest(unittest.TestCase):
+    def serve(self, answers, **kwargs):
+        server = StubApi(answers, **kwargs)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        client = AbstractApiClient('key', api_url=server.url, pool_size=10, backoff_base=0.01)
+        self.addCleanup(client.close)
+        return server, client
+
+    def test_concurrency_cap(self):
+        emails = [f'user{i}@example.test' for i in range(20)]
+        server, client = self.serve({}, latency=0.05)
+        AsyncVerificationEngine(client, concurrency=4).verify_many(emails)
+        self.assertEqual(len(server.started), 20)
+        self.assertEqual(server.max_in_flight, 4)
+
+    def test_token_bucket_pacing(self):
+        emails = [f'user{i}@example.test' for i in range(6)]
+        server, client = self.serve({})
+        AsyncVerificationEngine(client, concurrency=6, rate=20, burst=1).verify_many(emails)
+        # One token up front, then one every 50 ms
+        self.assertGreaterEqual(server.started[-1] - server.started[0], 0.2)
+
+    def test_answers_and_retried_429(self):
+        answers = {'ok@example.test': 'DELIVERABLE', 'gone@example.test': 'UNDELIVERABLE'}
+        server, client = self.serve(answers, throttled=['ok@example.test'])
+        verdicts = AsyncVerificationEngine(client, concurrency=2).verify_many(
+            ['ok@example.test', 'gone@example.test', 'maybe@example.test'])
+        self.assertEqual(verdicts, {'ok@example.test': True, 'gone@example.test': False,
+                                    'maybe@example.test': None})
+        self.assertEqual(len(server.started), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
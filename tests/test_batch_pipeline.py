@@ -0,0 +1,25 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch_pipeline import read_rows
+
+
+class ReadRowsTest(unittest.TestCase):
+    def test_jsonl_values_and_malformed_lines(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'names.jsonl')
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write('{"name": 123, "company": "a.test"}\n[1, 2]\n{bad\n"name"\n'
+                           '{"name": null}\n{"name": "Ann Lee", "company": null}\n')
+            counts = {}
+            rows = list(read_rows(path, domain_col='company', domain='x.test', counts=counts))
+        self.assertEqual(rows, [('123', 'a.test'), ('Ann Lee', 'x.test')])
+        self.assertEqual(counts, {'malformed': 3})
+
+
+if __name__ == '__main__':
+    unittest.main()
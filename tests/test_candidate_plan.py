@@ -0,0 +1,78 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from async_verifier import AsyncVerificationEngine
+from batch_pipeline import process_rows
+from candidate_plan import AssignedAddresses, CandidatePlan
+from email_core import format_email_all_styles
+from pattern_learner import PatternLearner
+from verifier_clients import MockVerifier
+
+
+def candidate_maps(names, domain='acme.test', styles=('initials', 'firstname.lastname')):
+    formats = format_email_all_styles(names, domain)
+    return [{style: formats[style][i] for style in styles} for i in range(len(names))]
+
+
+class CandidatePlanTest(unittest.TestCase):
+    def test_shared_address_is_ambiguous(self):
+        maps = candidate_maps(['John Doe', 'Jane Dale', 'John Doe', 'Alice Smith'])
+        plan = CandidatePlan(maps)
+        self.assertEqual(plan.people, 3)
+        self.assertEqual(plan.ambiguous, {'jd@acme.test'})
+        verdicts = {'initials': True, 'firstname.lastname': True}
+        self.assertEqual(plan.choose(maps[0], verdicts), ('john.doe@acme.test', ['jd@acme.test']))
+        self.assertEqual(plan.choose(maps[3], verdicts), ('as@acme.test', []))
+
+    def test_repeated_names_share_one_identification(self):
+        maps = candidate_maps(['John Doe', 'Alice Smith', 'John Doe', 'John Doe'])
+        client = MockVerifier({'jd@acme.test', 'alice.smith@acme.test'})
+        reported = []
+        results = AsyncVerificationEngine(client, concurrency=1).identify(
+            maps, on_result=lambda index, checked: reported.append(index))
+        self.assertEqual(sorted(reported), [0, 1, 2, 3])
+        self.assertEqual(results[0], {'initials': True})
+        self.assertEqual(results[2], results[0])
+        self.assertIsNot(results[2], results[0])
+        self.assertEqual(client.checked, 3)
+
+    def test_learned_style_falls_back_when_ambiguous(self):
+        maps = candidate_maps(['John Doe', 'Jane Dale'])
+        learner = PatternLearner(min_hits=1)
+        learner.record('acme.test', 'initials')
+        client = MockVerifier({'jd@acme.test', 'john.doe@acme.test', 'jane.dale@acme.test'})
+        results = AsyncVerificationEngine(client, concurrency=1).identify(maps, learner=learner)
+        # jd@ is everyone's and no one's: the other styles are tried
+        self.assertEqual(results, [{'initials': True, 'firstname.lastname': True}] * 2)
+
+    def test_assigned_addresses(self):
+        john, jane = candidate_maps(['John Doe', 'Jane Dale'])
+        assigned = AssignedAddresses(64)
+        assigned.assign('jd@acme.test', john)
+        self.assertEqual(assigned.taken([john]), set())
+        self.assertEqual(assigned.taken([jane]), {'jd@acme.test'})
+
+
+class CrossChunkTest(unittest.TestCase):
+    def identify(self, rows, **kwargs):
+        client = MockVerifier({'jd@acme.test', 'john.doe@acme.test', 'jane.dale@acme.test'})
+        engine = AsyncVerificationEngine(client, concurrency=1)
+        return [(result['email'], result['ambiguous'])
+                for result in process_rows(rows, 'identify', ('initials', 'firstname.lastname'),
+                                           engine=engine, **kwargs)]
+
+    def test_collision_with_an_earlier_chunk_is_flagged(self):
+        rows = [('John Doe', 'acme.test'), ('Jane Dale', 'acme.test'), ('John Doe', 'acme.test')]
+        self.assertEqual(self.identify(rows, chunk_size=1), [
+            ('jd@acme.test', []),
+            ('jane.dale@acme.test', ['jd@acme.test']),
+            ('jd@acme.test', []),
+        ])
+        self.assertEqual(self.identify(rows, chunk_size=1, assigned_memory=0)[1], ('jd@acme.test', []))
+
+
+if __name__ == '__main__':
+    unittest.main()
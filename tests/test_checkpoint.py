@@ -0,0 +1,122 @@
+import os
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from async_verifier import AsyncVerificationEngine
+from checkpoint import CheckpointJournal, identify_with_checkpoint
+from verifier_clients import MockVerifier
+
+STYLES = ('first', 'second', 'third')
+
+
+def candidate_maps(count):
+    # Only the last style is deliverable, so each name needs every check
+    return [{style: f'{style}{i}@example.com' for style in STYLES} for i in range(count)]
+
+
+class CancelResumeTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'checkpoint.jsonl')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def run_names(self, maps, keys, cancel_after=None):
+        cancel = threading.Event()
+        checks = []
+
+        def deliverable(email):
+            checks.append(email)
+            if cancel_after is not None and len(checks) >= cancel_after:
+                cancel.set()
+            return email.startswith('third')
+
+        engine = AsyncVerificationEngine(MockVerifier(deliverable), concurrency=1)
+        journal = CheckpointJournal(self.path)
+        done = []
+        try:
+            results = identify_with_checkpoint(engine, keys, maps, journal, cancel=cancel,
+                                               on_result=lambda index, checked: done.append(index))
+        finally:
+            journal.close()
+        return results, done
+
+    def test_cancelled_names_are_not_journaled(self):
+        maps = candidate_maps(40)
+        keys = [f'name{i}\texample.com' for i in range(40)]
+        results, done = self.run_names(maps, keys, cancel_after=20)
+
+        self.assertLess(len(done), 40)
+        journal = CheckpointJournal(self.path)
+        try:
+            journaled = [i for i, key in enumerate(keys) if key in journal]
+            for i in journaled:
+                self.assertTrue(journal.get(keys[i])['third'])
+        finally:
+            journal.close()
+        self.assertEqual(sorted(done), journaled)
+
+        results, resumed = self.run_names(maps, keys)
+        self.assertEqual(sorted(resumed), [i for i in range(40) if i not in journaled])
+        self.assertTrue(all(result['third'] for result in results))
+
+
+class JournalTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'checkpoint.jsonl')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_records_survive_a_cut_short_line(self):
+        journal = CheckpointJournal(self.path)
+        journal.record('a\texample.com', {'first': False})
+        journal.record('a\texample.com', {'first': True})
+        journal.close()
+        with open(self.path, 'a', encoding='utf-8') as file:
+            file.write('{"key": "b\\texample.com", "chec')
+
+        journal = CheckpointJournal(self.path)
+        self.assertEqual(journal.get('a\texample.com'), {'first': True})
+        self.assertNotIn('b\texample.com', journal)
+        journal.record('b\texample.com', {'first': True})
+        journal.close()
+
+        journal = CheckpointJournal(self.path)
+        try:
+            self.assertEqual(journal.get('b\texample.com'), {'first': True})
+            self.assertEqual(len(journal), 2)
+        finally:
+            journal.close()
+
+    def test_discard_keeps_other_runs_entries(self):
+        journal = CheckpointJournal(self.path)
+        journal.record('a\tacme.com', {'first': True})
+        journal.record('b\texample.com', {'first': True})
+        journal.close()
+
+        journal = CheckpointJournal(self.path)
+        self.assertIn('b\texample.com', journal)
+        journal.record('c\texample.com', {'first': True})
+        journal.discard()
+        journal = CheckpointJournal(self.path)
+        try:
+            self.assertEqual(len(journal), 1)
+            self.assertIn('a\tacme.com', journal)
+        finally:
+            journal.close()
+
+        journal = CheckpointJournal(self.path)
+        self.assertIn('a\tacme.com', journal)
+        journal.discard()
+        self.assertFalse(os.path.exists(self.path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import email_core
+from dns_preflight import (MAX_TTL, MIN_TTL, NO_DOMAIN, NO_MAIL, NULL_MX, OK, DomainPreflight, NoSuchDomain)
+
+
+class FakeResolver:
+    """
+    Offline resolver answering from `records`: {(domain, rdtype): (records, ttl)}.
+    Domains in `missing` do not exist; other lookups have no records.
+    """
+    def __init__(self, records=None, missing=()):
+        self.records = records or {}
+        self.missing = set(missing)
+        self.lookups = []
+
+    def resolve(self, domain, rdtype):
+        self.lookups.append((domain, rdtype))
+        if domain in self.missing:
+            raise NoSuchDomain(domain)
+        return self.records.get((domain, rdtype), ([], 300))
+
+
+class DomainPreflightTest(unittest.TestCase):
+    def test_states(self):
+        resolver = FakeResolver({
+            ('acme.test', 'MX'): ([(20, 'mx2.acme.test'), (10, 'mx1.acme.test')], 600),
+            ('nullmx.test', 'MX'): ([(0, '')], 600),
+            ('bare.test', 'A'): (['192.0.2.1'], 600),
+        }, missing=['gone.test'])
+        statuses = DomainPreflight(resolver).check_many(
+            ['acme.test', 'nullmx.test', 'bare.test', 'empty.test', 'gone.test'])
+
+        self.assertEqual(statuses['acme.test'].status, OK)
+        self.assertEqual(statuses['acme.test'].mx_hosts, ['mx1.acme.test', 'mx2.acme.test'])
+        self.assertEqual(statuses['nullmx.test'].status, NULL_MX)
+        self.assertEqual(statuses['bare.test'].mx_hosts, ['bare.test'])
+        self.assertEqual(statuses['empty.test'].status, NO_MAIL)
+        self.assertEqual(statuses['gone.test'].status, NO_DOMAIN)
+        self.assertEqual([domain for domain, status in statuses.items() if not status.accepts_mail],
+                         ['nullmx.test', 'empty.test', 'gone.test'])
+
+    def test_flags(self):
+        resolver = FakeResolver({
+            ('parked.test', 'MX'): ([(10, 'mx.parked.test')], 600),
+            ('parked.test', 'NS'): (['ns1.sedoparking.com'], 600),
+            ('mailinator.com', 'MX'): ([(10, 'mail.mailinator.com')], 600),
+            ('alias.test', 'MX'): ([(10, 'mx.yopmail.com')], 600),
+        })
+        preflight = DomainPreflight(resolver)
+        self.assertEqual(preflight.check('parked.test').flags, {'parked'})
+        self.assertEqual(preflight.check('mailinator.com').flags, {'disposable'})
+        self.assertEqual(preflight.check('alias.test').flags, {'disposable'})
+
+    def test_ttl_clamping_and_cache(self):
+        resolver = FakeResolver({
+            ('short.test', 'MX'): ([(10, 'mx.short.test')], 1),
+            ('long.test', 'MX'): ([(10, 'mx.long.test')], 10 * MAX_TTL),
+            ('long.test', 'NS'): (['ns.long.test'], 10 * MAX_TTL),
+        })
+        preflight = DomainPreflight(resolver)
+        with mock.patch('dns_preflight.time.monotonic', return_value=1000.0):
+            self.assertEqual(preflight.check('short.test').expires, 1000.0 + MIN_TTL)
+            self.assertEqual(preflight.check('long.test').expires, 1000.0 + MAX_TTL)
+            lookups = len(resolver.lookups)
+            preflight.check('Short.test ')
+            self.assertEqual(len(resolver.lookups), lookups)
+        with mock.patch('dns_preflight.time.monotonic', return_value=1000.0 + MIN_TTL + 1):
+            preflight.check('short.test')
+            self.assertGreater(len(resolver.lookups), lookups)
+
+    def test_dead_domain_skips_verification(self):
+        preflight = DomainPreflight(FakeResolver(missing=['gone.test']))
+        with mock.patch.object(email_core, '_preflight', preflight), \
+                mock.patch.object(email_core, 'make_verification_engine') as make_engine:
+            results = email_core.check_all_styles(['John Doe'], 'gone.test', checkpoint_path=None)
+        make_engine.assert_not_called()
+        self.assertTrue(all(result['checked'] and not result['is_valid'] for result in results['John Doe'].values()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import asyncio
+import os
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from async_verifier import AsyncVerificationEngine, DomainScheduler
+from benchmark import DomainSimulator
+
+STYLES = ('first', 'second', 'third')
+
+
+def candidate_maps(counts):
+    # `counts` names per domain; only the last style is deliverable
+    return [{style: f'{style}{i}@{domain}' for style in STYLES}
+            for domain, count in counts.items() for i in range(count)]
+
+
+class DomainSchedulerTest(unittest.TestCase):
+    def test_weighted_interleave(self):
+        async def order():
+            scheduler = DomainScheduler(weights={'a': 2})
+            for domain in 'abc':
+                for i in range(8):
+                    scheduler.add(domain, i)
+            taken = ''
+            while True:
+                item = await scheduler.next()
+                if item is None:
+                    return taken
+                taken += item[0]
+                await scheduler.release(item[0])
+
+        # a gets two turns in four until its queue runs out, then b and c alternate
+        self.assertEqual(asyncio.run(order()), 'abcaabcaabcaabcabcbcbcbc')
+
+    def test_domain_concurrency_is_never_exceeded(self):
+        maps = candidate_maps({'big.test': 60, 'small1.test': 5, 'small2.test': 5})
+        simulator = DomainSimulator(lambda email: email.startswith('third'), latency=0.002, capacity=2)
+        engine = AsyncVerificationEngine(simulator, concurrency=10, domain_concurrency=2)
+        results = engine.identify(maps)
+        self.assertEqual(simulator.throttled, {})
+        self.assertTrue(all(checked['third'] for checked in results))
+
+    def test_cancel_does_not_deadlock(self):
+        maps = candidate_maps({'big.test': 200, 'small.test': 20})
+        cancel = threading.Event()
+
+        def deliverable(email):
+            if simulator.calls >= 30:
+                cancel.set()
+            return email.startswith('third')
+
+        simulator = DomainSimulator(deliverable, latency=0.002)
+        engine = AsyncVerificationEngine(simulator, concurrency=8, domain_concurrency=1, domain_rate=200)
+        done = []
+        run = threading.Thread(target=lambda: done.append(engine.identify(maps, cancel=cancel)), daemon=True)
+        run.start()
+        run.join(10)
+        self.assertFalse(run.is_alive())
+        self.assertLess(sum(1 for checked in done[0] if checked.get('third')), len(maps))
+
+
+if __name__ == '__main__':
+    unittest.main()
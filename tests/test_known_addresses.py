@@ -0,0 +1,62 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from known_addresses import KnownAddressIndex, build_index
+
+
+class BuildIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'known.idx')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_last_verdict_wins(self):
+        build_index([('a@x.com', True), ('b@x.com', False), ('A@x.com', False)], self.path)
+        index = KnownAddressIndex(self.path)
+        try:
+            self.assertEqual(len(index), 2)
+            self.assertIs(index.get('a@x.com'), False)
+            self.assertIs(index.get('b@x.com'), False)
+            self.assertIsNone(index.get('c@x.com'))
+        finally:
+            index.close()
+
+    def test_rebuild_leaves_mapped_index_readable(self):
+        build_index([(f'a{i}@x.com', True) for i in range(1000)], self.path)
+        index = KnownAddressIndex(self.path)
+        try:
+            build_index([('b@x.com', False)], self.path)
+            self.assertIs(index.get('a999@x.com'), True)
+        finally:
+            index.close()
+        index = KnownAddressIndex(self.path)
+        try:
+            self.assertEqual(len(index), 1)
+        finally:
+            index.close()
+
+    def test_interrupted_build_keeps_previous_index(self):
+        build_index([('a@x.com', True)], self.path)
+
+        def pairs():
+            yield 'b@x.com', True
+            raise KeyboardInterrupt
+
+        with self.assertRaises(KeyboardInterrupt):
+            build_index(pairs(), self.path)
+        self.assertFalse(os.path.exists(self.path + '.tmp'))
+        index = KnownAddressIndex(self.path)
+        try:
+            self.assertIs(index.get('a@x.com'), True)
+        finally:
+            index.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import os
+import socket
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from smtp_verifier import SmtpVerifier
+
+try:
+    from aiosmtpd.controller import Controller
+except ImportError:
+    Controller = None
+
+MAILBOXES = {'john.doe@example.test', 'jane@example.test'}
+
+
+class StubHandler:
+    """
+    Accepts RCPT TO for MAILBOXES and any address of catchall.test,
+    advertises PIPELINING and counts the mail transactions.
+    """
+    def __init__(self):
+        self.transactions = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        session.host_name = hostname
+        return responses[:-1] + ['250-PIPELINING'] + responses[-1:]
+
+    async def handle_MAIL(self, server, session, envelope, address, mail_options):
+        self.transactions += 1
+        envelope.mail_from = address
+        return '250 OK'
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address in MAILBOXES or address.endswith('@catchall.test'):
+            return '250 OK'
+        return '550 No such user'
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@unittest.skipIf(Controller is None, "aiosmtpd is not installed")
+class SmtpVerifierTest(unittest.TestCase):
+    def setUp(self):
+        self.port = free_port()
+        self.handler = StubHandler()
+        self.controller = self.start()
+
+    def tearDown(self):
+        self.verifier.close()
+        self.controller.stop()
+
+    def start(self):
+        controller = Controller(self.handler, hostname='127.0.0.1', port=self.port)
+        controller.start()
+        return controller
+
+    def make_verifier(self, max_rcpt=50):
+        self.verifier = SmtpVerifier(port=self.port, max_rcpt=max_rcpt, timeout=5,
+                                     resolve=lambda domain: ['127.0.0.1'])
+        return self.verifier
+
+    def test_verdicts(self):
+        verifier = self.make_verifier()
+        self.assertEqual(verifier.check_many(['john.doe@example.test', 'jdoe@example.test']),
+                         {'john.doe@example.test': True, 'jdoe@example.test': False})
+        self.assertIs(verifier.is_catch_all('example.test'), False)
+
+    def test_catch_all(self):
+        verifier = self.make_verifier()
+        self.assertIsNone(verifier.check('john.doe@catchall.test'))
+        self.assertIs(verifier.is_catch_all('catchall.test'), True)
+
+    def test_pipelined_batches_across_rset(self):
+        verifier = self.make_verifier(max_rcpt=3)
+        emails = [f'user{i}@example.test' for i in range(6)] + ['jane@example.test']
+        verdicts = verifier.check_many(emails)
+        self.assertEqual(verdicts, dict((email, email == 'jane@example.test') for email in emails))
+        # Catch-all probe plus 7 addresses, 3 recipients per transaction
+        self.assertEqual(self.handler.transactions, 3)
+        session, _ = verifier._pool('127.0.0.1').acquire()
+        self.assertTrue(session.pipelining)
+        verifier._pool('127.0.0.1').release(session)
+
+    def test_stale_pooled_session_is_retried(self):
+        verifier = self.make_verifier()
+        self.assertIs(verifier.check('john.doe@example.test'), True)
+        # The server restarts and drops the idle pooled session
+        self.controller.stop()
+        self.controller = self.start()
+        self.assertIs(verifier.check('jane@example.test'), True)
+
+
+if __name__ == '__main__':
+    unittest.main()
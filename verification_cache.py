@@ -0,0 +1,138 @@
+import sqlite3
+import threading
+import time
+
+DAY = 24 * 60 * 60
+
+# How long each verdict stays valid, in seconds
+DEFAULT_TTLS = {
+    'deliverable': 30 * DAY,
+    'undeliverable': 7 * DAY,
+}
+
+
+def normalize_address(email):
+    """
+    Returns the cache key for an address.
+    """
+    return email.strip().lower()
+
+
+class VerificationCache:
+    """
+    Persistent on-disk cache of deliverability verdicts, stored in SQLite.
+    Entries expire after a per-verdict TTL, and once the cache holds more than
+    `max_entries` addresses the least recently used ones are evicted.
+    Only definite verdicts (True/False) are cached; failed checks are not.
+    """
+    def __init__(self, path='verification_cache.sqlite3', ttls=None, max_entries=100000,
+                 commit_every=100):
+        self.path = path
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.max_entries = max_entries
+        self.commit_every = commit_every
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS verdicts ('
+            'email TEXT PRIMARY KEY, deliverable INTEGER NOT NULL, '
+            'checked_at REAL NOT NULL, last_used REAL NOT NULL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS verdicts_last_used ON verdicts (last_used)')
+        self._conn.commit()
+        self._size = self._conn.execute('SELECT COUNT(*) FROM verdicts').fetchone()[0]
+
+    def _ttl(self, deliverable):
+        return self.ttls['deliverable' if deliverable else 'undeliverable']
+
+    def get(self, email):
+        """
+        Returns the cached verdict (True/False) for an address, or None on a miss.
+        """
+        key = normalize_address(email)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT deliverable, checked_at FROM verdicts WHERE email = ?', (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            deliverable = bool(row[0])
+            if now - row[1] > self._ttl(deliverable):
+                # Expired: drop it and report a miss
+                self._conn.execute('DELETE FROM verdicts WHERE email = ?', (key,))
+                self._size -= 1
+                self.misses += 1
+                self._written()
+                return None
+            self._conn.execute('UPDATE verdicts SET last_used = ? WHERE email = ?', (now, key))
+            self.hits += 1
+            self._written()
+            return deliverable
+
+    def put(self, email, deliverable):
+        """
+        Stores a verdict. None (a failed check) is ignored.
+        """
+        if deliverable is None:
+            return
+        key = normalize_address(email)
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                'UPDATE verdicts SET deliverable = ?, checked_at = ?, last_used = ? WHERE email = ?',
+                (int(bool(deliverable)), now, now, key)
+            )
+            if cursor.rowcount == 0:
+                self._conn.execute(
+                    'INSERT INTO verdicts (email, deliverable, checked_at, last_used) VALUES (?, ?, ?, ?)',
+                    (key, int(bool(deliverable)), now, now)
+                )
+                self._size += 1
+                if self._size > self.max_entries:
+                    self._evict(self._size - self.max_entries)
+            self._written()
+
+    def _evict(self, count):
+        # Remove the least recently used entries
+        self._conn.execute(
+            'DELETE FROM verdicts WHERE email IN '
+            '(SELECT email FROM verdicts ORDER BY last_used LIMIT ?)', (count,)
+        )
+        self._size -= count
+        self.evictions += count
+
+    def _written(self):
+        # Batch commits instead of syncing every lookup
+        self._pending += 1
+        if self._pending >= self.commit_every:
+            self._conn.commit()
+            self._pending = 0
+
+    def stats(self):
+        """
+        Returns hit/miss counters and the current size.
+        """
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'size': self._size,
+        }
+
+    def __len__(self):
+        return self._size
+
+    def close(self):
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
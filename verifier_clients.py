@@ -0,0 +1,238 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+ABSTRACT_API_URL = 'https://emailvalidation.abstractapi.com/v1/'
+ZEROBOUNCE_BATCH_URL = 'https://bulkapi.zerobounce.net/v2/validatebatch'
+
+# HTTP statuses worth retrying: rate limited or temporary server trouble
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Abstract API deliverability values with a definite answer; UNKNOWN says nothing
+ABSTRACT_VERDICTS = {'DELIVERABLE': True, 'UNDELIVERABLE': False}
+# ZeroBounce statuses with a definite answer; the others (catch-all, unknown...) say nothing
+ZEROBOUNCE_VERDICTS = {'valid': True, 'invalid': False, 'spamtrap': False, 'abuse': False, 'do_not_mail': False}
+
+
+def parse_retry_after(value):
+    """
+    Returns the delay in seconds from a Retry-After header (seconds or HTTP date), or None.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt, base=1.0, cap=60.0, retry_after=None):
+    """
+    Jittered exponential backoff before retry number `attempt` (0-based),
+    never shorter than the server's Retry-After.
+    """
+    delay = random.uniform(0, min(cap, base * 2 ** attempt))
+    return max(delay, retry_after or 0.0)
+
+
+class VerifierClient:
+    """
+    Interface of the deliverability backends used by AsyncVerificationEngine.
+    check(email) returns True (deliverable), False (not) or None (unknown).
+    Providers with a bulk endpoint set `batch_size` and override check_many,
+    so the engine sends them up to `batch_size` addresses per call.
+    """
+    batch_size = None
+
+    def check(self, email):
+        raise NotImplementedError
+
+    def check_many(self, emails):
+        """
+        Checks several addresses and returns a dict mapping each one to its verdict.
+        """
+        return {email: self.check(email) for email in dict.fromkeys(emails)}
+
+    def close(self):
+        pass
+
+
+class HttpVerifierClient(VerifierClient):
+    """
+    Base of the HTTP providers: one pooled keep-alive session, so the TCP
+    and TLS handshakes are paid once per connection rather than per address.
+    With a `limiter`, every request waits for it and reports back (an
+    AdaptiveRateLimiter then adapts its rate); 429 and 5xx answers are
+    retried up to `max_retries` times with jittered exponential backoff
+    honoring Retry-After. With `metrics`, request latency, response codes,
+    retries and errors are recorded.
+    """
+    def __init__(self, pool_size=10, timeout=10, metrics=None, limiter=None, max_retries=3, backoff_base=1.0):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.timeout = timeout
+        self.metrics = metrics
+        self.limiter = limiter
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def _request(self, method, url, **kwargs):
+        # One HTTP call; returns the response, or None when the request failed
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+        except Exception as e:
+            if self.metrics is not None:
+                self.metrics.inc('api_errors_total', error=type(e).__name__)
+            return None
+        if self.metrics is not None:
+            self.metrics.observe('api_request_seconds', time.perf_counter() - start)
+            self.metrics.inc('api_responses_total', status=str(response.status_code))
+            if response.status_code == 429:
+                self.metrics.inc('api_rate_limited_total')
+        return response
+
+    def _send(self, method, url, **kwargs):
+        """
+        Sends a request, pacing and retrying it as described above.
+        Returns the parsed JSON of a 200 answer, or None.
+        """
+        metrics = self.metrics
+        for attempt in range(self.max_retries + 1):
+            if self.limiter is not None:
+                waited = self.limiter.acquire()
+                if metrics is not None:
+                    metrics.observe('stage_seconds', waited, stage='rate_limit_wait')
+            response = self._request(method, url, **kwargs)
+            if response is None:
+                return None
+            if response.status_code not in RETRY_STATUSES:
+                break
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            if response.status_code == 429 and self.limiter is not None:
+                self.limiter.on_throttle(retry_after)
+            if attempt == self.max_retries:
+                return None
+            if metrics is not None:
+                metrics.inc('api_retries_total')
+            time.sleep(backoff_delay(attempt, self.backoff_base, retry_after=retry_after))
+
+        if response.status_code != 200:
+            return None
+        if self.limiter is not None:
+            self.limiter.on_success()
+        try:
+            return response.json()
+        except ValueError as e:
+            if metrics is not None:
+                metrics.inc('api_errors_total', error=type(e).__name__)
+            return None
+
+    def close(self):
+        self.session.close()
+
+
+class AbstractApiClient(HttpVerifierClient):
+    """
+    Abstract API deliverability client. The API checks one address per call.
+    Only DELIVERABLE and UNDELIVERABLE answers are definite.
+    """
+    def __init__(self, api_key, api_url=ABSTRACT_API_URL, **kwargs):
+        super().__init__(**kwargs)
+        self.api_key = api_key
+        self.api_url = api_url
+
+    def check(self, email):
+        """
+        Checks one address.
+        Returns True if deliverable, False if not, None if the check failed
+        or the API does not know.
+        """
+        data = self._send('GET', self.api_url, params={'api_key': self.api_key, 'email': email})
+        if not isinstance(data, dict):
+            return None
+        verdict = ABSTRACT_VERDICTS.get(data.get('deliverability'))
+        if verdict and not (data.get('is_valid_format') or {}).get('value'):
+            # Deliverable only counts with a valid format
+            return False
+        return verdict
+
+
+class ZeroBounceClient(HttpVerifierClient):
+    """
+    ZeroBounce client using its batch endpoint: up to `batch_size` addresses
+    per request. Only 'valid' and 'invalid'-type statuses are definite.
+    """
+    def __init__(self, api_key, api_url=ZEROBOUNCE_BATCH_URL, batch_size=100, **kwargs):
+        super().__init__(**kwargs)
+        self.api_key = api_key
+        self.api_url = api_url
+        self.batch_size = batch_size
+
+    def check_many(self, emails):
+        unique = list(dict.fromkeys(emails))
+        verdicts = dict.fromkeys(unique)
+        for start in range(0, len(unique), self.batch_size):
+            batch = unique[start:start + self.batch_size]
+            data = self._send('POST', self.api_url, json={
+                'api_key': self.api_key,
+                'email_batch': [{'email_address': email} for email in batch],
+            })
+            if not isinstance(data, dict):
+                continue
+            for result in data.get('email_batch') or []:
+                email = result.get('address')
+                if email in verdicts:
+                    verdicts[email] = ZEROBOUNCE_VERDICTS.get(result.get('status'))
+        return verdicts
+
+    def check(self, email):
+        return self.check_many([email])[email]
+
+
+class MockVerifier(VerifierClient):
+    """
+    Local provider for tests and benchmarks: no network, verdicts from
+    `deliverable` (a collection of addresses or a predicate), an optional
+    `latency` per call and, with `batch_size`, bulk calls like a batch API.
+    Addresses in `unknown` get a None verdict. Calls are counted.
+    """
+    def __init__(self, deliverable=(), latency=0.0, batch_size=None, unknown=()):
+        if callable(deliverable):
+            self.is_deliverable = deliverable
+        else:
+            deliverable = set(deliverable)
+            self.is_deliverable = deliverable.__contains__
+        self.latency = latency
+        self.batch_size = batch_size
+        self.unknown = set(unknown)
+        self.calls = 0
+        self.checked = 0
+        self._lock = threading.Lock()
+
+    def _verdict(self, email):
+        if email in self.unknown:
+            return None
+        return bool(self.is_deliverable(email))
+
+    def check_many(self, emails):
+        unique = list(dict.fromkeys(emails))
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.calls += 1
+            self.checked += len(unique)
+        return {email: self._verdict(email) for email in unique}
+
+    def check(self, email):
+        return self.check_many([email])[email]